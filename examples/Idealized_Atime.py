@@ -143,7 +143,7 @@ for i in range(1, nb_steps+1):
         # Keyboard interrupt in case simulation take a while and we want to show current state of simulation
         break
 
-speedMap = pyff.helpers.computeSpeed(ff.getDoubleArray("BMap")[0,0,:,:])*float(ff["minimalPropagativeFrontDepth"])
+speedMap = pyff.helpers.computeSpeed(ff.getDoubleArray("BMap")[0,0,:,:], spacing=float(ff["minimalPropagativeFrontDepth"]))
 
 
 
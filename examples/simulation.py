@@ -44,26 +44,26 @@ class ForeFireSimulation:
         """
         # Initialize pyforefire module
         ff = forefire.ForeFire()
-        ff["propagationModel"] = propagation_model
-        ff["SWx"], ff["SWy"], ff["Lx"], ff["Ly"] = domain
-        ff["fuelsTable"] = fuels_table()
+        parameters = {"propagationModel": propagation_model, "fuelsTable": fuels_table()}
+        parameters["SWx"], parameters["SWy"], parameters["Lx"], parameters["Ly"] = domain
 
         if spatial_increment:
             assert spatial_increment > 0, 'spatial_increment must be strictly positive'
-            ff["spatialIncrement"] = spatial_increment
+            parameters["spatialIncrement"] = spatial_increment
         if minimal_propagative_front_depth:
             assert minimal_propagative_front_depth > 0, 'minimal_propagative_front_depth must be strictly positive'
-            ff["minimalPropagativeFrontDepth"] = minimal_propagative_front_depth
+            parameters["minimalPropagativeFrontDepth"] = minimal_propagative_front_depth
         if perimeter_resolution:
             assert perimeter_resolution > 0, 'perimeter_resolution must be strictly positive'
-            ff["perimeterResolution"] = perimeter_resolution
+            parameters["perimeterResolution"] = perimeter_resolution
         if relax:
             assert 0 <= relax <= 1, 'relax must be in [0, 1]'
-            ff["relax"] = relax
+            parameters["relax"] = relax
         if min_speed:
-            ff["minSpeed"] = min_speed
+            parameters["minSpeed"] = min_speed
         if burned_map_layer:
-            ff["bmapLayer"] = burned_map_layer
+            parameters["bmapLayer"] = burned_map_layer
+        ff.setParameters(parameters)
 
         self.ff = ff
     
@@ -81,6 +81,8 @@ class ForeFireSimulation:
         pathes = []
         bournawt=[]
         times=[]
+        burnr = 0
+        cell_area = np.power(float(self.ff["minimalPropagativeFrontDepth"]),2)
         for i in range(1, nb_steps+1):
             try:
                 # Advance timestep by step_size
@@ -89,10 +91,8 @@ class ForeFireSimulation:
                 # Get pathes from previous execution
                 newPathes = printToPathe(self.ff.execute("print[]"))
                 pathes += newPathes
-                bmap=self.ff.getDoubleArray("BMap")
-                burnrbool = np.logical_not(np.isinf(bmap))
-                # Count the True values in non_inf array
-                burnr = np.sum(burnrbool*np.power(float(self.ff["minimalPropagativeFrontDepth"]),2))
+                # Add the cells burned during the step
+                burnr += len(self.ff.getNewlyBurned()["time"])*cell_area
                 bournawt.append(burnr)
                 times.append(i*step_size)
 
@@ -0,0 +1,164 @@
+#ifndef PYFOREFIRE_ENGINE_STATICS_H
+#define PYFOREFIRE_ENGINE_STATICS_H
+
+/* Statics of the ForeFire engine (libforefire 2.5.0) and what each
+ * instance of pyForeFire does with them. Every static member of the
+ * engine classes is listed here : a static added or renamed upstream has
+ * to be added to this list, and to EngineStatics when it holds a state
+ * of the simulation.
+ *
+ * Swapped with the instance, in EngineStatics :
+ *	Command::init, currentFrontCompleted, endTime, bmapOutputUpdate,
+ *		numBmapOutputs, numAtmoIterations			step bookkeeping
+ *	FireDomain::createdNodes, trashNodes, trashFronts, mainFrontBackup
+ *								atoms of the domain
+ *	FireNode::fdepth, ccurvature, smoothing, relax, minSpeed,
+ *		minFrontDepth, nmlScheme, curvScheme, FireDomain::fdScheme
+ *								schemes of the fronts, set
+ *								by FireDomain from the parameters
+ *	FireDomain::outputs, commandOutputs, FireFront::outputs,
+ *		FireNode::outputs, FDCell::outputs			debugging outputs, same
+ *	FireDomain::atmoIterNumber				coupling iterations
+ *	DataBroker::fuelLayer, dummyLayer, altitudeLayer,
+ *		forcedArrivalTimeLayer, slopeLayer, moistureLayer,
+ *		temperatureLayer, windULayer, windVLayer, heatFluxLayer,
+ *		PwindULayer, PwindVLayer				shortcuts to the layers
+ *
+ * Saved with the instance by PLibForeFire itself :
+ *	Command::currentSession					savedSession
+ *	Command::startTime, refTime				startTime, refTime
+ *	Command::currentLevel					level
+ *	FireDomain::propModelsTable, fluxModelsTable		savedPropagationModels,
+ *								savedFluxModels
+ *	SimulationParameters::instance values			savedParameters
+ *
+ * Reset by the engine when the front being built is completed, which is
+ * done before another instance runs :
+ *	Command::lastReadLoc, previousNode, leftLinkNode, rightLinkNode
+ *
+ * Deliberately shared by all the instances :
+ *	Command::value, SimulationParameters::instance		the singletons
+ *	Command::firstCommand, refTabs				indentation of the first
+ *								command, the same for all
+ *	Command::parallel, outputDirs,
+ *		FireDomain::parallelDispatchDomains			MPI coupling, unused here
+ *	FireDomain::recycleNodes, recycleFronts			never set by the engine
+ *	FireFront::frontNum, ForeFireAtom::instanceNRCount	counters no result depends on
+ *	StringRepresentation::currentLevel, outputstr		rebuilt by each print
+ *	DataBroker::params, FireNode::params,
+ *		SimulationParameters::undefined and the like		constants
+ */
+typedef struct _EngineStatics
+{
+	/* step bookkeeping of Command */
+	bool init;
+	bool currentFrontCompleted;
+	double endTime;
+	double bmapOutputUpdate;
+	int numBmapOutputs;
+	int numAtmoIterations;
+	/* atoms of the domain, deleted with it, and its backup front */
+	list<FireNode*> createdNodes;
+	list<FireNode*> trashNodes;
+	list<FireFront*> trashFronts;
+	FireFrontData* mainFrontBackup;
+	/* schemes of the fronts, copied from the parameters by FireDomain */
+	bool frontDepthComputation;
+	bool curvatureComputation;
+	double smoothing;
+	double relax;
+	double minSpeed;
+	double minFrontDepth;
+	FireNode::NormalScheme normalScheme;
+	FireNode::CurvatureScheme curvatureScheme;
+	int frontDepthScheme;
+	/* debugging outputs, also set by FireDomain, and coupling iterations */
+	bool domainOutputs;
+	bool commandOutputs;
+	bool frontOutputs;
+	bool nodeOutputs;
+	bool cellOutputs;
+	size_t atmoIterNumber;
+	/* shortcuts of the DataBroker to the layers of the domain */
+	DataLayer<double>* brokerLayers[9];
+	FluxLayer<double>* heatFluxLayer;
+	XYZTDataLayer<double>* windULayer;
+	XYZTDataLayer<double>* windVLayer;
+} EngineStatics;
+
+#ifdef PYFOREFIRE_ENGINE_ACCESS
+
+/* Private statics of the engine are reached through the explicit
+ * instantiation of a template taking their address, the one place where
+ * the language does not check access : engineStatic(Tag()) returns the
+ * address of the static named with the tag. The instantiations define
+ * functions, this part is only compiled in _pyforefire.cpp. */
+template<typename Tag, typename Tag::type member>
+struct EngineStaticAccess {
+	friend typename Tag::type engineStatic(Tag){
+		return member;
+	}
+};
+
+#define ENGINE_STATIC(tag, type_, member) \
+	struct tag { \
+		typedef type_* type; \
+		friend type engineStatic(tag); \
+	}; \
+	template struct EngineStaticAccess<tag, &member>
+
+ENGINE_STATIC(CommandInit, bool, Command::init);
+ENGINE_STATIC(CommandFrontCompleted, bool, Command::currentFrontCompleted);
+ENGINE_STATIC(CommandEndTime, double, Command::endTime);
+ENGINE_STATIC(CommandBmapOutputUpdate, double, Command::bmapOutputUpdate);
+ENGINE_STATIC(CommandNumBmapOutputs, int, Command::numBmapOutputs);
+ENGINE_STATIC(CommandNumAtmoIterations, int, Command::numAtmoIterations);
+ENGINE_STATIC(DomainCreatedNodes, list<FireNode*>, FireDomain::createdNodes);
+ENGINE_STATIC(DomainTrashNodes, list<FireNode*>, FireDomain::trashNodes);
+ENGINE_STATIC(DomainTrashFronts, list<FireFront*>, FireDomain::trashFronts);
+ENGINE_STATIC(DomainFrontBackup, FireFrontData*, FireDomain::mainFrontBackup);
+ENGINE_STATIC(NodeFrontDepth, bool, FireNode::fdepth);
+ENGINE_STATIC(NodeCurvature, bool, FireNode::ccurvature);
+ENGINE_STATIC(NodeSmoothing, double, FireNode::smoothing);
+ENGINE_STATIC(NodeRelax, double, FireNode::relax);
+ENGINE_STATIC(NodeMinSpeed, double, FireNode::minSpeed);
+ENGINE_STATIC(NodeMinFrontDepth, double, FireNode::minFrontDepth);
+ENGINE_STATIC(BrokerFuelLayer, DataLayer<double>*, DataBroker::fuelLayer);
+ENGINE_STATIC(BrokerDummyLayer, DataLayer<double>*, DataBroker::dummyLayer);
+ENGINE_STATIC(BrokerAltitudeLayer, DataLayer<double>*, DataBroker::altitudeLayer);
+ENGINE_STATIC(BrokerArrivalTimeLayer, DataLayer<double>*, DataBroker::forcedArrivalTimeLayer);
+ENGINE_STATIC(BrokerSlopeLayer, DataLayer<double>*, DataBroker::slopeLayer);
+ENGINE_STATIC(BrokerMoistureLayer, DataLayer<double>*, DataBroker::moistureLayer);
+ENGINE_STATIC(BrokerTemperatureLayer, DataLayer<double>*, DataBroker::temperatureLayer);
+ENGINE_STATIC(BrokerWindULayer, DataLayer<double>*, DataBroker::windULayer);
+ENGINE_STATIC(BrokerWindVLayer, DataLayer<double>*, DataBroker::windVLayer);
+
+/* FireDomain::fdScheme has a private enum type, which cannot be named
+ * either : it is read and written as an int */
+template<typename Tag, typename T, T* member>
+struct EngineEnumAccess {
+	friend int getEngineEnum(Tag){
+		return *member;
+	}
+	friend void setEngineEnum(Tag, int value){
+		*member = static_cast<T>(value);
+	}
+};
+
+struct DomainFrontDepthScheme {
+	friend int getEngineEnum(DomainFrontDepthScheme);
+	friend void setEngineEnum(DomainFrontDepthScheme, int);
+};
+template struct EngineEnumAccess<DomainFrontDepthScheme, decltype(FireDomain::fdScheme), &FireDomain::fdScheme>;
+
+/* the table of fuels parsed by the DataBroker of a domain is a member,
+ * its tag returns the member pointer */
+struct BrokerFuelsTable {
+	typedef vector<map<string, double> > DataBroker::* type;
+	friend type engineStatic(BrokerFuelsTable);
+};
+template struct EngineStaticAccess<BrokerFuelsTable, &DataBroker::fuelPropertiesTable>;
+
+#endif /* PYFOREFIRE_ENGINE_ACCESS */
+
+#endif /* PYFOREFIRE_ENGINE_STATICS_H */
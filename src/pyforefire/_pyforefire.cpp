@@ -1,3 +1,5 @@
+/* the only file reaching the private statics of the engine */
+#define PYFOREFIRE_ENGINE_ACCESS
 #include "_pyforefire.h"
 
 namespace py = pybind11;
@@ -5,16 +7,686 @@ namespace py = pybind11;
 using namespace std;
 using namespace libforefire;
 #include <iostream>
+#include <cerrno>
+#include <cstdlib>
+#include <cstdio>
 
-Command* pyxecutor;
-Command::Session* session;
-SimulationParameters* params;
+/* Engine-wide bookkeeping shared by all the instances */
+static PLibForeFire* activeInstance = 0;
+static bool pristineCaptured = false;
+static Command::Session pristineSession;
+static map<string, string> pristineParameters;
+static size_t engineLevel = 0;
 
+/* A single engine serves every instance : calls are serialised on this
+ * lock, which is always taken with the GIL released and given back
+ * before the GIL is acquired again. Recursive as public methods may
+ * call each other. */
+static recursive_mutex engineMutex;
+typedef lock_guard<recursive_mutex> EngineLock;
+
+/* value returned by SimulationParameters for keys that were never set */
+static const string undefinedParameter = "1234567890";
+
+/* shortcuts of the DataBroker, in the order of EngineStatics::brokerLayers */
+static DataLayer<double>** const brokerLayers[] = {
+	engineStatic(BrokerFuelLayer()), engineStatic(BrokerDummyLayer())
+	, engineStatic(BrokerAltitudeLayer()), engineStatic(BrokerArrivalTimeLayer())
+	, engineStatic(BrokerSlopeLayer()), engineStatic(BrokerMoistureLayer())
+	, engineStatic(BrokerTemperatureLayer()), engineStatic(BrokerWindULayer())
+	, engineStatic(BrokerWindVLayer())
+};
+static const size_t numBrokerLayers = sizeof(brokerLayers) / sizeof(brokerLayers[0]);
+static_assert(numBrokerLayers == sizeof(EngineStatics::brokerLayers) / sizeof(EngineStatics::brokerLayers[0])
+		, "every shortcut of the DataBroker has to be saved");
+
+/* values of the engine before any instance used it */
+static EngineStatics pristineStatics;
+
+static EngineStatics captureEngineStatics(){
+	EngineStatics state;
+	state.init = *engineStatic(CommandInit());
+	state.currentFrontCompleted = *engineStatic(CommandFrontCompleted());
+	state.endTime = *engineStatic(CommandEndTime());
+	state.bmapOutputUpdate = *engineStatic(CommandBmapOutputUpdate());
+	state.numBmapOutputs = *engineStatic(CommandNumBmapOutputs());
+	state.numAtmoIterations = *engineStatic(CommandNumAtmoIterations());
+	state.createdNodes = *engineStatic(DomainCreatedNodes());
+	state.trashNodes = *engineStatic(DomainTrashNodes());
+	state.trashFronts = *engineStatic(DomainTrashFronts());
+	state.mainFrontBackup = *engineStatic(DomainFrontBackup());
+	state.frontDepthComputation = *engineStatic(NodeFrontDepth());
+	state.curvatureComputation = *engineStatic(NodeCurvature());
+	state.smoothing = *engineStatic(NodeSmoothing());
+	state.relax = *engineStatic(NodeRelax());
+	state.minSpeed = *engineStatic(NodeMinSpeed());
+	state.minFrontDepth = *engineStatic(NodeMinFrontDepth());
+	state.normalScheme = FireNode::nmlScheme;
+	state.curvatureScheme = FireNode::curvScheme;
+	state.frontDepthScheme = getEngineEnum(DomainFrontDepthScheme());
+	state.domainOutputs = FireDomain::outputs;
+	state.commandOutputs = FireDomain::commandOutputs;
+	state.frontOutputs = FireFront::outputs;
+	state.nodeOutputs = FireNode::outputs;
+	state.cellOutputs = FDCell::outputs;
+	state.atmoIterNumber = FireDomain::atmoIterNumber;
+	for ( size_t k = 0; k < numBrokerLayers; k++ ) state.brokerLayers[k] = *brokerLayers[k];
+	state.heatFluxLayer = DataBroker::heatFluxLayer;
+	state.windULayer = DataBroker::PwindULayer;
+	state.windVLayer = DataBroker::PwindVLayer;
+	return state;
+}
+
+/* exchanges the atoms of a domain with the ones of the engine */
+static void swapDomainAtoms(EngineStatics& state){
+	swap(state.createdNodes, *engineStatic(DomainCreatedNodes()));
+	swap(state.trashNodes, *engineStatic(DomainTrashNodes()));
+	swap(state.trashFronts, *engineStatic(DomainTrashFronts()));
+	swap(state.mainFrontBackup, *engineStatic(DomainFrontBackup()));
+}
+
+/* deletes a domain with the atoms installed in the engine */
+static void deleteDomain(FireDomain* domain){
+	delete domain;
+	/* trashed nodes were deleted with the created ones */
+	engineStatic(DomainTrashNodes())->clear();
+	*engineStatic(DomainFrontBackup()) = 0;
+}
+
+/* Domains with views on their layers, and their atoms once released by
+ * their instance : the last view deletes them */
+struct ViewedDomain {
+	size_t views;
+	bool released;
+	EngineStatics atoms;
+};
+static map<FireDomain*, ViewedDomain> viewedDomains;
+
+static void releaseView(void* pointer){
+	FireDomain* domain = static_cast<FireDomain*>(pointer);
+	unique_ptr<py::gil_scoped_release> release;
+	if ( PyGILState_Check() ) release.reset(new py::gil_scoped_release());
+	EngineLock lock(engineMutex);
+	map<FireDomain*, ViewedDomain>::iterator viewed = viewedDomains.find(domain);
+	if ( --viewed->second.views > 0 ) return;
+	if ( viewed->second.released ){
+		/* the atoms of the active instance are set aside meanwhile */
+		swapDomainAtoms(viewed->second.atoms);
+		deleteDomain(domain);
+		swapDomainAtoms(viewed->second.atoms);
+	}
+	viewedDomains.erase(viewed);
+}
+
+/* exchanges the values of an instance with the ones of the engine */
+static void swapEngineStatics(EngineStatics& state){
+	swap(state.init, *engineStatic(CommandInit()));
+	swap(state.currentFrontCompleted, *engineStatic(CommandFrontCompleted()));
+	swap(state.endTime, *engineStatic(CommandEndTime()));
+	swap(state.bmapOutputUpdate, *engineStatic(CommandBmapOutputUpdate()));
+	swap(state.numBmapOutputs, *engineStatic(CommandNumBmapOutputs()));
+	swap(state.numAtmoIterations, *engineStatic(CommandNumAtmoIterations()));
+	swapDomainAtoms(state);
+	swap(state.frontDepthComputation, *engineStatic(NodeFrontDepth()));
+	swap(state.curvatureComputation, *engineStatic(NodeCurvature()));
+	swap(state.smoothing, *engineStatic(NodeSmoothing()));
+	swap(state.relax, *engineStatic(NodeRelax()));
+	swap(state.minSpeed, *engineStatic(NodeMinSpeed()));
+	swap(state.minFrontDepth, *engineStatic(NodeMinFrontDepth()));
+	swap(state.normalScheme, FireNode::nmlScheme);
+	swap(state.curvatureScheme, FireNode::curvScheme);
+	int frontDepthScheme = getEngineEnum(DomainFrontDepthScheme());
+	setEngineEnum(DomainFrontDepthScheme(), state.frontDepthScheme);
+	state.frontDepthScheme = frontDepthScheme;
+	swap(state.domainOutputs, FireDomain::outputs);
+	swap(state.commandOutputs, FireDomain::commandOutputs);
+	swap(state.frontOutputs, FireFront::outputs);
+	swap(state.nodeOutputs, FireNode::outputs);
+	swap(state.cellOutputs, FDCell::outputs);
+	swap(state.atmoIterNumber, FireDomain::atmoIterNumber);
+	for ( size_t k = 0; k < numBrokerLayers; k++ ) swap(state.brokerLayers[k], *brokerLayers[k]);
+	swap(state.heatFluxLayer, DataBroker::heatFluxLayer);
+	swap(state.windULayer, DataBroker::PwindULayer);
+	swap(state.windVLayer, DataBroker::PwindVLayer);
+}
+
+static map<string, string> captureParameters(SimulationParameters* params){
+	map<string, string> values;
+	vector<string> keys = params->getAllKeys();
+	for ( size_t i = 0; i < keys.size(); i++ ){
+		values[keys[i]] = params->getParameter(keys[i]);
+	}
+	return values;
+}
+
+static void installParameters(SimulationParameters* params, const map<string, string>& values){
+	vector<string> keys = params->getAllKeys();
+	for ( size_t i = 0; i < keys.size(); i++ ){
+		if ( values.find(keys[i]) == values.end() ) params->setParameter(keys[i], undefinedParameter);
+	}
+	map<string, string>::const_iterator it;
+	for ( it = values.begin(); it != values.end(); ++it ){
+		if ( params->getParameter(it->first) != it->second ) params->setParameter(it->first, it->second);
+	}
+}
+
+/* Parameters are stored as strings : Python numbers are written as
+ * they print, floats at full precision */
+static string parameterString(py::handle value){
+	if ( py::isinstance<py::bool_>(value) ) return value.cast<bool>() ? "1" : "0";
+	if ( py::isinstance<py::str>(value) ) return value.cast<string>();
+	if ( py::isinstance<py::int_>(value) or py::hasattr(value, "__index__") ){
+		return py::str(py::int_(py::reinterpret_borrow<py::object>(value)));
+	}
+	if ( py::isinstance<py::float_>(value) or py::hasattr(value, "__float__") ){
+		/* through a double, NumPy floats are float subclasses printing their type */
+		return py::repr(py::float_(value.cast<double>()));
+	}
+	throw std::runtime_error("Unsupported value type");
+}
+
+/* and read back as the int, float or string they spell */
+static py::object parameterValue(const string& value){
+	const char* start = value.c_str();
+	char* end = 0;
+	errno = 0;
+	long long i = strtoll(start, &end, 10);
+	if ( end != start and *end == '\0' and errno == 0 ) return py::int_(i);
+	double d = strtod(start, &end);
+	if ( end != start and *end == '\0' ) return py::float_(d);
+	return py::str(value);
+}
+
+/* splits a command line into its name and its indentation level */
+static string commandName(const string& command, size_t& numTabs){
+	size_t pos = 0;
+	numTabs = 0;
+	while ( pos < command.size() ){
+		if ( command[pos] == '\t' ){
+			numTabs++;
+			pos++;
+		} else if ( command.compare(pos, 4, "    ") == 0 ){
+			numTabs++;
+			pos += 4;
+		} else if ( command[pos] == ' ' ){
+			pos++;
+		} else {
+			break;
+		}
+	}
+	size_t end = command.find('[', pos);
+	if ( end == string::npos ) end = command.size();
+	return command.substr(pos, end - pos);
+}
+
+/* Setup records keep arrays the caller cannot change any more : the copy
+ * converted for the engine when the call made one, a copy of the array
+ * given otherwise, both read-only. Read-only arrays owning their data,
+ * as recorded ones are, are kept as they are so that clones and
+ * snapshots share them. */
+static py::array recordedArray(py::array values, py::array converted){
+	py::array recorded = converted;
+	if ( converted.ptr() == values.ptr() ){
+		if ( !values.writeable() and values.owndata() ) return values;
+		recorded = values.attr("copy")("K");
+	}
+	recorded.attr("setflags")(py::arg("write") = false);
+	return recorded;
+}
+
+/* Layers are stored by the engine with x varying slowest and t fastest,
+ * which is the Fortran order of a (t, z, y, x) shaped array. Values are
+ * converted to that layout, which copies them only once if needed. */
+template<typename T>
+static py::array_t<T, py::array::f_style | py::array::forcecast> layerValues(py::array values
+		, size_t& nx, size_t& ny, size_t& nz, size_t& nt){
+	if ( values.ndim() < 2 or values.ndim() > 4 ){
+		throw std::invalid_argument("layer values must be shaped (y, x), (z, y, x) or (t, z, y, x)");
+	}
+	auto data = py::array_t<T, py::array::f_style | py::array::forcecast>::ensure(values);
+	if ( !data ) throw py::error_already_set();
+	size_t nn[] = {1, 1, 1, 1};
+	for ( ssize_t i = 0; i < data.ndim(); i++ ){
+		nn[4 - data.ndim() + i] = (size_t) data.shape(i);
+	}
+	nt = nn[0];
+	nz = nn[1];
+	ny = nn[2];
+	nx = nn[3];
+	return data;
+}
+
+/* single copy of a layer, reordered from Fortran to C order */
+static void copyToCOrder(FFArray<double>* srcD, double* reshaped_data){
+	double* data = srcD->getData();
+	size_t nnx = srcD->getDim("x");
+	size_t nny = srcD->getDim("y");
+	size_t nnz = srcD->getDim("z");
+	size_t nnt = srcD->getDim("t");
+	for (size_t x = 0; x < nnx; ++x) {
+		for (size_t y = 0; y < nny; ++y) {
+			for (size_t z = 0; z < nnz; ++z) {
+				for (size_t t = 0; t < nnt; ++t) {
+					size_t c_index = x + nnx * (y + nny * (z + nnz * t)); // C order index
+					size_t fortran_index = t + nnt * (z + nnz * (y + nny * x)); // Fortran order index
+					reshaped_data[c_index] = data[fortran_index];
+				}
+			}
+		}
+	}
+}
+
+/* Blocks of stride x stride cells are either sampled at their first
+ * cell or reduced to their min, max or mean */
+enum { noReduction, minReduction, maxReduction, meanReduction };
+
+static int blockReduction(const string& reduce){
+	if ( reduce.empty() ) return noReduction;
+	if ( reduce == "min" ) return minReduction;
+	if ( reduce == "max" ) return maxReduction;
+	if ( reduce == "mean" ) return meanReduction;
+	throw std::invalid_argument("reduce must be min, max or mean");
+}
+
+/* copy of the cells [i0, i1) x [j0, j1) of a layer in C order */
+static void copyWindow(FFArray<double>* srcD, ssize_t i0, ssize_t i1, ssize_t j0, ssize_t j1
+		, ssize_t stride, int reduction, double* out){
+	double* data = srcD->getData();
+	ssize_t nny = srcD->getDim("y");
+	ssize_t nnz = srcD->getDim("z");
+	ssize_t nnt = srcD->getDim("t");
+	ssize_t nox = (i1 - i0 + stride - 1) / stride;
+	ssize_t noy = (j1 - j0 + stride - 1) / stride;
+	for ( ssize_t x = 0; x < nox; x++ ){
+		ssize_t bx0 = i0 + x * stride;
+		ssize_t bx1 = ( reduction == noReduction ) ? bx0 + 1 : min(bx0 + stride, i1);
+		for ( ssize_t y = 0; y < noy; y++ ){
+			ssize_t by0 = j0 + y * stride;
+			ssize_t by1 = ( reduction == noReduction ) ? by0 + 1 : min(by0 + stride, j1);
+			for ( ssize_t z = 0; z < nnz; z++ ){
+				for ( ssize_t t = 0; t < nnt; t++ ){
+					double value = data[t + nnt * (z + nnz * (by0 + nny * bx0))];
+					double sum = 0;
+					for ( ssize_t bx = bx0; bx < bx1; bx++ ){
+						for ( ssize_t by = by0; by < by1; by++ ){
+							double v = data[t + nnt * (z + nnz * (by + nny * bx))];
+							if ( reduction == minReduction ) value = min(value, v);
+							else if ( reduction == maxReduction ) value = max(value, v);
+							sum += v;
+						}
+					}
+					if ( reduction == meanReduction ) value = sum / ((bx1 - bx0) * (by1 - by0));
+					out[x + nox * (y + noy * (z + nnz * t))] = value;
+				}
+			}
+		}
+	}
+}
+
+/* Nodes of the fronts, walked in the same order as print[] */
+struct FrontNodes {
+	vector<double> loc;
+	vector<double> vel;
+	vector<long> offsets;
+	vector<long> ids;
+	vector<long> levels;
+	/* what a snapshot also needs to restart the nodes and fronts */
+	vector<long> nodeIds;
+	vector<double> depths;
+	vector<double> curvatures;
+	vector<double> times;
+	vector<double> frontTimes;
+};
+
+static void collectFronts(FireFront* front, FireFront* domainFront, long frontLevel, FrontNodes& nodes){
+	if ( front != domainFront ){
+		FireNode* fn = front->getHead();
+		if ( fn == 0 ) return;
+		size_t numFN = front->getNumFN();
+		for ( size_t k = 0; k < numFN; k++ ){
+			FFPoint loc = fn->getLoc();
+			FFVector vel = fn->getVel();
+			nodes.loc.push_back(loc.getX());
+			nodes.loc.push_back(loc.getY());
+			nodes.loc.push_back(loc.getZ());
+			nodes.vel.push_back(vel.getVx());
+			nodes.vel.push_back(vel.getVy());
+			nodes.vel.push_back(vel.getVz());
+			nodes.nodeIds.push_back(fn->getShortID());
+			nodes.depths.push_back(fn->getFrontDepth());
+			nodes.curvatures.push_back(fn->getCurvature());
+			nodes.times.push_back(fn->getTime());
+			fn = fn->getNext();
+		}
+		nodes.frontTimes.push_back(front->getTime());
+		nodes.ids.push_back(front->getShortID());
+		nodes.levels.push_back(frontLevel);
+		nodes.offsets.push_back(nodes.loc.size() / 3);
+	}
+	list<FireFront*> innerFronts = front->getInnerFronts();
+	list<FireFront*>::iterator innerFront;
+	for ( innerFront = innerFronts.begin(); innerFront != innerFronts.end(); ++innerFront ){
+		collectFronts(*innerFront, domainFront, frontLevel + 1, nodes);
+	}
+}
+
+static void countFronts(FireFront* front, FireFront* domainFront, size_t& numNodes, size_t& numFronts){
+	if ( front != domainFront ){
+		numNodes += front->getNumFN();
+		numFronts++;
+	}
+	list<FireFront*> innerFronts = front->getInnerFronts();
+	list<FireFront*>::iterator innerFront;
+	for ( innerFront = innerFronts.begin(); innerFront != innerFronts.end(); ++innerFront ){
+		countFronts(*innerFront, domainFront, numNodes, numFronts);
+	}
+}
+
+/* Length, nodes and rates of spread of the fronts */
+struct FrontsSummary {
+	double perimeter;
+	size_t fronts;
+	size_t nodes;
+	double minROS;
+	double sumROS;
+	double maxROS;
+};
+
+static void summarizeFronts(FireFront* front, FireFront* domainFront, FrontsSummary& summary){
+	if ( front != domainFront ){
+		FireNode* fn = front->getHead();
+		if ( fn == 0 ) return;
+		size_t numFN = front->getNumFN();
+		for ( size_t k = 0; k < numFN and fn->getNext() != 0; k++ ){
+			FFPoint loc = fn->getLoc();
+			FFPoint next = fn->getNext()->getLoc();
+			FFVector vel = fn->getVel();
+			double ros = hypot(vel.getVx(), vel.getVy());
+			summary.perimeter += hypot(next.getX() - loc.getX(), next.getY() - loc.getY());
+			summary.minROS = min(summary.minROS, ros);
+			summary.maxROS = max(summary.maxROS, ros);
+			summary.sumROS += ros;
+			summary.nodes++;
+			fn = fn->getNext();
+		}
+		summary.fronts++;
+	}
+	list<FireFront*> innerFronts = front->getInnerFronts();
+	list<FireFront*>::iterator innerFront;
+	for ( innerFront = innerFronts.begin(); innerFront != innerFronts.end(); ++innerFront ){
+		summarizeFronts(*innerFront, domainFront, summary);
+	}
+}
+
+static size_t loadScalarLayer(PLibForeFire& self, char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, py::array values){
+	size_t nx, ny, nz, nt;
+	auto data = layerValues<double>(values, nx, ny, nz, nt);
+	// bytes copied to reach the engine layout, none for Fortran ordered doubles
+	size_t moved = ( data.ptr() == values.ptr() ) ? 0 : data.nbytes();
+	{
+		py::gil_scoped_release release;
+		self.addScalarLayer(type, name, x0, y0, t0, width, height, timespan, nx, ny, nz, nt, const_cast<double*>(data.data()));
+	}
+	self.recordLayer("addScalarLayer", type, name, x0, y0, t0, width, height, timespan, recordedArray(values, data));
+	return moved;
+}
+
+/* Fuel tables are given as structured arrays, one field per property and
+ * one row per fuel, and reach the engine as columns of doubles */
+static void loadFuelsTable(PLibForeFire& self, py::array table){
+	py::object names = table.dtype().attr("names");
+	if ( names.is_none() or table.ndim() != 1 ){
+		throw std::invalid_argument("fuels table must be a 1D structured array, one field per property");
+	}
+	vector<string> fields = names.cast<vector<string>>();
+	vector<vector<double> > columns(fields.size());
+	for ( size_t f = 0; f < fields.size(); f++ ){
+		py::array_t<double, py::array::c_style | py::array::forcecast> column(table[py::str(fields[f])]);
+		columns[f].assign(column.data(), column.data() + column.size());
+	}
+	{
+		py::gil_scoped_release release;
+		self.setFuelsTable(fields, columns);
+	}
+	self.recordFuelsTable(recordedArray(table, table));
+}
+
+static size_t loadIndexLayer(PLibForeFire& self, char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, py::array values){
+	size_t nx, ny, nz, nt;
+	auto data = layerValues<int>(values, nx, ny, nz, nt);
+	// bytes copied to reach the engine layout, none for Fortran ordered int32
+	size_t moved = ( data.ptr() == values.ptr() ) ? 0 : data.nbytes();
+	{
+		py::gil_scoped_release release;
+		self.addIndexLayer(type, name, x0, y0, t0, width, height, timespan, nx, ny, nz, nt, const_cast<int*>(data.data()));
+	}
+	self.recordLayer("addIndexLayer", type, name, x0, y0, t0, width, height, timespan, recordedArray(values, data));
+	return moved;
+}
+
+/* Arrays of the fronts, with the depth, curvature and times of the nodes
+ * for a snapshot */
+static py::dict frontArrays(const FrontNodes& nodes, bool restartable){
+	ssize_t numNodes = nodes.loc.size() / 3;
+	py::dict fronts;
+	fronts["loc"] = py::array_t<double>({numNodes, (ssize_t) 3}, nodes.loc.data());
+	fronts["vel"] = py::array_t<double>({numNodes, (ssize_t) 3}, nodes.vel.data());
+	fronts["offsets"] = py::array_t<long>(nodes.offsets.size(), nodes.offsets.data());
+	fronts["id"] = py::array_t<long>(nodes.ids.size(), nodes.ids.data());
+	fronts["level"] = py::array_t<long>(nodes.levels.size(), nodes.levels.data());
+	if ( restartable ){
+		fronts["nodeId"] = py::array_t<long>(nodes.nodeIds.size(), nodes.nodeIds.data());
+		fronts["depth"] = py::array_t<double>(nodes.depths.size(), nodes.depths.data());
+		fronts["curvature"] = py::array_t<double>(nodes.curvatures.size(), nodes.curvatures.data());
+		fronts["time"] = py::array_t<double>(nodes.times.size(), nodes.times.data());
+		fronts["frontTime"] = py::array_t<double>(nodes.frontTimes.size(), nodes.frontTimes.data());
+	}
+	return fronts;
+}
+
+template<typename T>
+static vector<T> frontColumn(py::dict fronts, const char* key, size_t size){
+	py::array_t<T, py::array::c_style | py::array::forcecast> column = fronts[key].cast<py::array_t<T, py::array::c_style | py::array::forcecast>>();
+	if ( (size_t) column.size() != size ){
+		throw std::invalid_argument(string("fronts of the snapshot have ") + to_string(column.size())
+				+ " values of " + key + " for " + to_string(size));
+	}
+	return vector<T>(column.data(), column.data() + size);
+}
+
+/* Arrays of a snapshot back to nodes, each front given its nodes in the
+ * order of collectFronts */
+static FrontNodes restartableFronts(py::dict fronts){
+	FrontNodes nodes;
+	nodes.offsets = frontColumn<long>(fronts, "offsets", fronts["offsets"].cast<py::array>().size());
+	size_t numFronts = ( nodes.offsets.size() > 0 ) ? nodes.offsets.size() - 1 : 0;
+	size_t numNodes = ( numFronts > 0 ) ? nodes.offsets.back() : 0;
+	for ( size_t f = 0; f < numFronts; f++ ){
+		if ( nodes.offsets[f] < 0 or nodes.offsets[f] > nodes.offsets[f + 1] ){
+			throw std::invalid_argument("offsets of the fronts of the snapshot are not increasing");
+		}
+	}
+	nodes.loc = frontColumn<double>(fronts, "loc", 3 * numNodes);
+	nodes.vel = frontColumn<double>(fronts, "vel", 3 * numNodes);
+	nodes.nodeIds = frontColumn<long>(fronts, "nodeId", numNodes);
+	nodes.depths = frontColumn<double>(fronts, "depth", numNodes);
+	nodes.curvatures = frontColumn<double>(fronts, "curvature", numNodes);
+	nodes.times = frontColumn<double>(fronts, "time", numNodes);
+	nodes.ids = frontColumn<long>(fronts, "id", numFronts);
+	nodes.levels = frontColumn<long>(fronts, "level", numFronts);
+	nodes.frontTimes = frontColumn<double>(fronts, "frontTime", numFronts);
+	return nodes;
+}
+
+/* Nodes back to the commands building the fronts, as a saved front is
+ * read, at full precision */
+static vector<string> frontCommands(const FrontNodes& nodes, size_t domainID){
+	vector<string> lines;
+	ostringstream line;
+	line.precision(numeric_limits<double>::max_digits10);
+	for ( size_t f = 0; f + 1 < nodes.offsets.size(); f++ ){
+		string tabs(nodes.levels[f], '\t');
+		line.str("");
+		line << tabs << "FireFront[domain=" << domainID << ";t=" << nodes.frontTimes[f] << "]";
+		lines.push_back(line.str());
+		for ( long k = nodes.offsets[f]; k < nodes.offsets[f + 1]; k++ ){
+			line.str("");
+			line << tabs << "\tFireNode[domain=" << domainID << ";id=" << nodes.nodeIds[k]
+					<< ";fdepth=" << nodes.depths[k] << ";kappa=" << nodes.curvatures[k]
+					<< ";loc=(" << nodes.loc[3 * k] << "," << nodes.loc[3 * k + 1] << "," << nodes.loc[3 * k + 2] << ")"
+					<< ";vel=(" << nodes.vel[3 * k] << "," << nodes.vel[3 * k + 1] << "," << nodes.vel[3 * k + 2] << ")"
+					<< ";t=" << nodes.times[k] << ";state=init;frontId=" << nodes.ids[f] << "]";
+			lines.push_back(line.str());
+		}
+	}
+	return lines;
+}
 
 PLibForeFire::PLibForeFire() {
-	pyxecutor = new Command();
-	session = &(pyxecutor->currentSession);
+	executor = new Command();
+	session = &(executor->currentSession);
 	params = session->params;
+	if ( !pristineCaptured ){
+		pristineSession = *session;
+		pristineParameters = captureParameters(params);
+		pristineStatics = captureEngineStatics();
+		pristineCaptured = true;
+	}
+	savedSession = pristineSession;
+	savedParameters = pristineParameters;
+	savedStatics = pristineStatics;
+	savedPropagationModels.assign(FireDomain::NUM_MAX_PROPMODELS, (PropagationModel*) 0);
+	savedFluxModels.assign(FireDomain::NUM_MAX_FLUXMODELS, (FluxModel*) 0);
+	startTime = 0;
+	refTime = 0;
+	level = 0;
+	profiling = false;
+	numEvents = 0;
+	feed.domain = 0;
+	burnedArea.domain = 0;
+	diagnosticsCapacity = 0;
+	numDiagnostics = 0;
+	for ( size_t k = 0; k < 4; k++ ){
+		for ( size_t l = 0; l < 4; l++ ) eventStats[k][l] = PhaseStats();
+	}
+	building = false;
+}
+
+PLibForeFire::~PLibForeFire() {
+	/* instances are mostly destroyed by Python, the GIL is given back
+	 * before taking the engine lock as the bindings do */
+	unique_ptr<py::gil_scoped_release> release;
+	if ( PyGILState_Check() ) release.reset(new py::gil_scoped_release());
+	EngineLock lock(engineMutex);
+	activate();
+	executeCommand("clear");
+	deactivate();
+	delete executor;
+}
+
+void PLibForeFire::activate(){
+	if ( activeInstance == this ) return;
+	if ( activeInstance ) activeInstance->deactivate();
+
+	*session = savedSession;
+	installParameters(params, savedParameters);
+	/* models are registered in tables shared by all the domains */
+	copy(savedPropagationModels.begin(), savedPropagationModels.end(), FireDomain::propModelsTable);
+	copy(savedFluxModels.begin(), savedFluxModels.end(), FireDomain::fluxModelsTable);
+	swapEngineStatics(savedStatics);
+	executor->setStartTime(startTime);
+	executor->setReferenceTime(refTime);
+	while ( engineLevel < level ){
+		executor->increaseLevel();
+		engineLevel++;
+	}
+	while ( engineLevel > level ){
+		executor->decreaseLevel();
+		engineLevel--;
+	}
+	activeInstance = this;
+}
+
+void PLibForeFire::deactivate(){
+	/* the engine reads the nodes of a front through shared cursors,
+	 * a front being built has to be closed before leaving the engine */
+	if ( building and session->ff != 0 ) executor->completeFront(session->ff);
+	building = false;
+	savedSession = *session;
+	savedParameters = captureParameters(params);
+	savedPropagationModels.assign(FireDomain::propModelsTable
+			, FireDomain::propModelsTable + FireDomain::NUM_MAX_PROPMODELS);
+	savedFluxModels.assign(FireDomain::fluxModelsTable
+			, FireDomain::fluxModelsTable + FireDomain::NUM_MAX_FLUXMODELS);
+	swapEngineStatics(savedStatics);
+	startTime = executor->getTime();
+	refTime = executor->refTime;
+	activeInstance = 0;
+}
+
+void PLibForeFire::prepareCommand(const string& command){
+	size_t numTabs;
+	string name = commandName(command, numTabs);
+	if ( name == "goTo" or name == "step" ){
+		/* the engine only completes the front being built on the very
+		 * first step of a session, it is done here for the following ones */
+		if ( building and session->ff != 0 ) executor->completeFront(session->ff);
+		building = false;
+	}
+}
+
+void PLibForeFire::trackCommand(const string& command, bool hadDomain){
+	size_t numTabs;
+	string name = commandName(command, numTabs);
+	if ( name == "FireDomain" or name == "clear" ){
+		feed.domain = 0;
+		burnedArea.domain = 0;
+	}
+	if ( name == "FireDomain" and !hadDomain and executor->getDomain() != 0 ){
+		level++;
+	} else if ( name == "FireFront" and numTabs != level ){
+		level = numTabs;
+	} else if ( name == "FireNode" ){
+		building = true;
+	} else if ( name == "clear" ){
+		/* the engine drops the domain but keeps its level */
+		while ( level > 0 ){
+			executor->decreaseLevel();
+			level--;
+		}
+		session->ff = 0;
+		building = false;
+	}
+	if ( name == "FireDomain" or name == "addLayer" or name == "setParameter" or name == "setParameters"
+			or name == "trigger" or name == "loadData" ){
+		recordSetup("execute", vector<string>(1, command));
+	} else if ( name == "clear" ){
+		/* the setup of the domain goes with it, moving the records does
+		 * not touch the arrays they hold */
+		for ( size_t i = 0; i < setup.size(); i++ ) clearedSetup.push_back(std::move(setup[i]));
+		setup.clear();
+	}
+	engineLevel = level;
+}
+
+void PLibForeFire::recordSetup(const string& call, const vector<string>& names){
+	SetupRecord record;
+	record.call = call;
+	record.names = names;
+	setup.push_back(std::move(record));
+}
+
+/* Layers are recorded as the read-only arrays of recordedArray(), which
+ * snapshots and clones share */
+void PLibForeFire::recordLayer(const string& call, char *type, char *name, double x0, double y0, double t0, double width, double height, double timespan, py::object values){
+	SetupRecord record;
+	record.call = call;
+	record.names.push_back(string(type));
+	record.names.push_back(string(name));
+	double box[] = {x0, y0, t0, width, height, timespan};
+	record.box.assign(box, box + 6);
+	record.values = values;
+	setup.push_back(std::move(record));
 }
 
 void PLibForeFire::createDomain( int id
@@ -26,65 +698,88 @@ void PLibForeFire::createDomain( int id
 		,  int mdimz,  double* zgrid
 		,  double dt){
 
+	EngineLock lock(engineMutex);
+	activate();
 
 	/* Defining the Fire Domain */
-		if (session->fd) delete session->fd;
+		releaseDomain();
+		/* the trackers of the burnt points start over with the new domain,
+		 * which may be allocated where the previous one was */
+		feed.domain = 0;
+		burnedArea.domain = 0;
 
 		session->fd = new FireDomain(id, year, month, day, t, lat, lon
 				, mdimx, meshx, mdimy, meshy, mdimz, dt);
 
-		// pyxecutor->getDomain() = session->fd; // FIXME
+		// executor->getDomain() = session->fd; // FIXME
 
 		// A FireDomain has been created, the level is increased
-		pyxecutor->increaseLevel();
+		executor->increaseLevel();
+		level++;
+		engineLevel = level;
 		session->ff = session->fd->getDomainFront();
 		// Defining the timetable of the events to be be in the domain
-		if (session->tt) delete session->tt;
 		session->tt = new TimeTable();
 		// Associating this timetable to the domain
 		session->fd->setTimeTable(session->tt);
 		// Defining the simulator
-		if (session->sim) delete session->sim;
 		session->sim = new Simulator(session->tt, session->fd->outputs);
 
 
-		session->outStrRep = new StringRepresentation(pyxecutor->getDomain());
+		session->outStrRep = new StringRepresentation(executor->getDomain());
 		if ( SimulationParameters::GetInstance()->getInt("outputsUpdate") != 0 ){
 			session->tt->insert(new FFEvent(session->outStrRep));
 		}
 
 		double deltaT = session->fd->getSecondsFromReferenceTime(year, month, day, t);
 
-		pyxecutor->setReferenceTime(deltaT);
-		pyxecutor->setStartTime(deltaT);
+		executor->setReferenceTime(deltaT);
+		executor->setStartTime(deltaT);
 }
 
 void PLibForeFire::addLayer(char *type, char* layername, char* keyname){
 
-	pyxecutor->getDomain()->addLayer(string(type),string(layername),string(keyname));
+	EngineLock lock(engineMutex);
+	activate();
+	executor->getDomain()->addLayer(string(type),string(layername),string(keyname));
+	vector<string> names;
+	names.push_back(string(type));
+	names.push_back(string(layername));
+	names.push_back(string(keyname));
+	recordSetup("addLayer", names);
 }
 
 void PLibForeFire::setInt(char* name, int val){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	params->setInt(lname,val);
 }
 
 int PLibForeFire::getInt(char* name ){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	return params->getInt(lname);
 }
 
 void PLibForeFire::setDouble(char* name, double val){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	params->setDouble(lname,val);
 }
 
 double PLibForeFire::getDouble(char* name ){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	return params->getDouble(lname);
 }
 
 void PLibForeFire::setString(char* name, char* val){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	string lval(val);
 		params->setParameter(lname,val);
@@ -92,24 +787,416 @@ void PLibForeFire::setString(char* name, char* val){
 
 string PLibForeFire::getString(char *name)
 {
-
+	EngineLock lock(engineMutex);
+	activate();
 	return params->getParameter(string(name));
 }
 
-string PLibForeFire::execute(char *command)
-{
+void PLibForeFire::setParameters(const map<string, string>& values){
+	EngineLock lock(engineMutex);
+	activate();
+	map<string, string>::const_iterator it;
+	for ( it = values.begin(); it != values.end(); ++it ) params->setParameter(it->first, it->second);
+}
+
+/* The columns of a fuel table go to the DataBroker of the domain, which
+ * gives them to the models registered later, and to the fuel properties
+ * of the models already registered, as the broker extracts them */
+void PLibForeFire::setFuelsTable(const vector<string>& names, const vector<vector<double> >& columns){
+	EngineLock lock(engineMutex);
+	activate();
+	FireDomain* domain = executor->getDomain();
+	if ( domain == 0 ){
+		throw std::runtime_error("no FireDomain to load the fuels table in, create it first");
+	}
+	size_t index = find(names.begin(), names.end(), "Index") - names.begin();
+	if ( index == names.size() ){
+		throw std::invalid_argument("fuels table has no Index field");
+	}
+	const vector<double>& fuels = columns[index];
+	const size_t maxFuels = FuelDataLayer<double>::MAXNUMFUELS;
+	for ( size_t row = 0; row < fuels.size(); row++ ){
+		if ( !(fuels[row] >= 0 and fuels[row] < maxFuels) or fuels[row] != floor(fuels[row]) ){
+			ostringstream msg;
+			msg << "fuel index " << fuels[row] << " is not an integer of [0, " << maxFuels << ")";
+			throw std::invalid_argument(msg.str());
+		}
+	}
+
+	/* every fuel property read by a model has to be in the table */
+	vector<ForeFireModel*> models;
+	for ( size_t i = 0; i < FireDomain::NUM_MAX_PROPMODELS; i++ ){
+		ForeFireModel* model = FireDomain::propModelsTable[i];
+		if ( model != 0 and model->numFuelProperties > 0 ) models.push_back(model);
+	}
+	for ( size_t i = 0; i < FireDomain::NUM_MAX_FLUXMODELS; i++ ){
+		ForeFireModel* model = FireDomain::fluxModelsTable[i];
+		if ( model != 0 and model->numFuelProperties > 0 ) models.push_back(model);
+	}
+	vector<vector<size_t> > modelFields(models.size());
+	for ( size_t m = 0; m < models.size(); m++ ){
+		for ( size_t p = 0; p < models[m]->numFuelProperties; p++ ){
+			const string& property = models[m]->fuelPropertiesNames[p];
+			size_t f = find(names.begin(), names.end(), property) - names.begin();
+			if ( f == names.size() ){
+				throw std::invalid_argument("fuels table has no " + property + " field, read by the "
+						+ models[m]->getName() + " model");
+			}
+			modelFields[m].push_back(f);
+		}
+	}
+
+	vector<map<string, double> >& table = domain->getDataBroker()->*engineStatic(BrokerFuelsTable());
+	table.assign(fuels.size(), map<string, double>());
+	for ( size_t row = 0; row < fuels.size(); row++ ){
+		for ( size_t f = 0; f < names.size(); f++ ) table[row][names[f]] = columns[f][row];
+	}
+	for ( size_t m = 0; m < models.size(); m++ ){
+		FFArray<double>* properties = new FFArray<double>("fuelProperties", 0., maxFuels, models[m]->numFuelProperties);
+		for ( size_t row = 0; row < fuels.size(); row++ ){
+			for ( size_t p = 0; p < modelFields[m].size(); p++ ){
+				(*properties)((size_t) fuels[row], p) = columns[modelFields[m][p]][row];
+			}
+		}
+		delete models[m]->fuelPropertiesTable;
+		models[m]->fuelPropertiesTable = properties;
+	}
+}
+
+/* restore() loads the latest table given to the domain again */
+void PLibForeFire::recordFuelsTable(py::object table){
+	if ( !setup.empty() and setup.back().call == "setFuelsTable" ){
+		setup.back().values = table;
+		return;
+	}
+	SetupRecord record;
+	record.call = "setFuelsTable";
+	record.values = table;
+	setup.push_back(std::move(record));
+}
+
+/* all the parameters when no key is given */
+map<string, string> PLibForeFire::getParameters(const vector<string>& keys){
+	EngineLock lock(engineMutex);
+	activate();
+	if ( keys.empty() ) return captureParameters(params);
+	map<string, string> values;
+	for ( size_t k = 0; k < keys.size(); k++ ) values[keys[k]] = params->getParameter(keys[k]);
+	return values;
+}
+
+string PLibForeFire::executeCommand(const string& command){
 	ostringstream stringOut;
-	pyxecutor->setOstringstream(&stringOut);
+	executor->setOstringstream(&stringOut);
 	string smsg(command);
-	pyxecutor->ExecuteCommand(smsg);
+	size_t numTabs;
+	string name = commandName(smsg, numTabs);
+	bool hadDomain = executor->getDomain() != 0;
+	prepareCommand(smsg);
+	chrono::steady_clock::time_point start;
+	if ( profiling ) start = chrono::steady_clock::now();
+	if ( name == "clear" ){
+		/* the engine would leave the timetable and simulator behind */
+		releaseDomain();
+	} else {
+		executor->ExecuteCommand(smsg);
+	}
+	if ( profiling ) countCall(name, start);
+	if ( name == "goTo" and diagnosticsCapacity > 0 and executor->getDomain() != 0 ) recordDiagnostics();
+	trackCommand(smsg, hadDomain);
 	return stringOut.str();
 }
 
+/* Frees the domain of the instance, with its layers, fronts, timetable,
+ * simulator and outputs. The nodes and the layer shortcuts the engine
+ * keeps in statics are the ones of the instance, the statics left
+ * pointing to the domain are reset. A domain with views on its layers
+ * is set aside with its atoms until the last view is dropped. */
+void PLibForeFire::releaseDomain(){
+	FireDomain* domain = session->fd;
+	if ( domain == 0 ) return;
+	delete session->sim;
+	delete session->tt;
+	delete session->outStrRep;
+	session->sim = 0;
+	session->tt = 0;
+	session->outStrRep = 0;
+	session->fd = 0;
+	session->ff = 0;
+	map<FireDomain*, ViewedDomain>::iterator viewed = viewedDomains.find(domain);
+	if ( viewed != viewedDomains.end() ){
+		viewed->second.released = true;
+		swapDomainAtoms(viewed->second.atoms);
+	} else {
+		deleteDomain(domain);
+	}
+	for ( size_t k = 0; k < numBrokerLayers; k++ ) *brokerLayers[k] = 0;
+	DataBroker::heatFluxLayer = 0;
+	DataBroker::PwindULayer = 0;
+	DataBroker::PwindVLayer = 0;
+}
 
-void PLibForeFire::addScalarLayer(char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, py::array_t<double> values){
+void PLibForeFire::close(){
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		executeCommand("clear");
+		feed.domain = 0;
+		burnedArea.domain = 0;
+		feed.points.clear();
+		feed.cells.clear();
+		burnedArea.points.clear();
+		burnedArea.cells.clear();
+	}
+	/* layer arrays kept to replay the setup */
+	setup.clear();
+	dropClearedSetup();
+}
+
+void PLibForeFire::dropClearedSetup(){
+	clearedSetup.clear();
+}
+
+string PLibForeFire::execute(char *command)
+{
+	EngineLock lock(engineMutex);
+	activate();
+	return executeCommand(string(command));
+}
 
-	FFPoint *p0 = new FFPoint(x0,y0,0);
-	FFPoint *pe = new FFPoint(width,height,0);
+/* Lines ForeFire prints when a command fails, on std::cout or std::cerr :
+ * any other output of a command is informational */
+static const char* const commandFailures[] = {
+	"unknown command", "unknown post operator", "is (are) not fit for command"
+	, "' misses ", "you have to specify a time", "ended in error", "Error:"
+};
+
+static string failureLines(const string& console){
+	string failures;
+	istringstream lines(console);
+	string line;
+	while ( getline(lines, line) ){
+		for ( size_t k = 0; k < sizeof(commandFailures) / sizeof(commandFailures[0]); k++ ){
+			if ( line.find(commandFailures[k]) != string::npos ){
+				failures += line + "\n";
+				break;
+			}
+		}
+	}
+	return failures;
+}
+
+/* The console of the engine is redirected while a single command runs,
+ * under the engine lock, and given back even when the command throws */
+struct ConsoleCapture {
+	streambuf* out;
+	streambuf* err;
+	ConsoleCapture(ostringstream& console)
+		: out(cout.rdbuf(console.rdbuf())), err(cerr.rdbuf(console.rdbuf())){
+	}
+	~ConsoleCapture(){
+		cout.rdbuf(out);
+		cerr.rdbuf(err);
+	}
+};
+
+py::list PLibForeFire::executeBatch(const vector<string>& commands){
+	vector<string> outputs(commands.size());
+	vector<string> errors(commands.size());
+	vector<string> consoles(commands.size());
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		/* ForeFire reports the failures of the commands on its console,
+		 * which is captured for each command of the batch */
+		for ( size_t i = 0; i < commands.size(); i++ ){
+			if ( commands[i].find_first_not_of(" \t\r\n") == string::npos ) continue;
+			ostringstream console;
+			string failure;
+			{
+				ConsoleCapture capture(console);
+				try {
+					outputs[i] = executeCommand(commands[i]);
+				} catch ( const std::exception& e ){
+					failure = string(e.what()) + "\n";
+				} catch ( ... ){
+					failure = "command " + commands[i] + " ended in error\n";
+				}
+			}
+			consoles[i] = console.str();
+			errors[i] = failureLines(consoles[i]) + failure;
+		}
+	}
+	dropClearedSetup();
+
+	py::list results;
+	for ( size_t i = 0; i < commands.size(); i++ ){
+		py::object error = py::none();
+		if ( !errors[i].empty() ) error = py::str(errors[i]);
+		results.append(py::make_tuple(outputs[i], error, consoles[i]));
+	}
+	return results;
+}
+
+void PLibForeFire::goToTime(double t){
+	if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+	/* goTo does the bookkeeping of the engine, it is reached through its command */
+	ostringstream command;
+	command.precision(numeric_limits<double>::max_digits10);
+	command << "goTo[t=" << t << "]";
+	/* the very first step also completes the initialization of the
+	 * engine, it is left to the command */
+	if ( !profiling or *engineStatic(CommandInit()) or t <= executor->getTime() ){
+		executeCommand(command.str());
+		return;
+	}
+	chrono::steady_clock::time_point start = chrono::steady_clock::now();
+	prepareCommand(command.str());
+	bool recovered = advanceProfiled(t);
+	callStats["goTo"].time += chrono::duration<double>(chrono::steady_clock::now() - start).count();
+	executeCommand(command.str());
+	if ( recovered ){
+		/* closing the step as the engine does after a topological problem */
+		FireDomain* domain = executor->getDomain();
+		domain->setSafeTopologyMode(false);
+		domain->validateTopology("advance");
+		domain->backupState();
+	}
+}
+
+/* Processes the events up to t with the loop of Simulator::goTo, timing
+ * each phase of each event, the goTo command then finds the events done
+ * and only does its bookkeeping. After a topological problem the state
+ * is restored for the command to redo the step in safe mode, as the
+ * engine does, and true is returned. */
+bool PLibForeFire::advanceProfiled(double t){
+	FireDomain* domain = executor->getDomain();
+	TimeTable* schedule = session->sim->getSchedule();
+	domain->setTime(executor->getTime());
+	chrono::steady_clock::time_point start;
+	auto tick = [&start](PhaseStats& phase){
+		chrono::steady_clock::time_point end = chrono::steady_clock::now();
+		phase.calls++;
+		phase.time += chrono::duration<double>(end - start).count();
+		start = end;
+	};
+	try {
+		while ( schedule->getTime() <= t + EPSILONT ){
+			FFEvent* upEvent = schedule->getUpcomingEvent();
+			if ( !upEvent ) break;
+			ForeFireAtom* atom = upEvent->getAtom();
+			PhaseStats* phases = eventStats[3];
+			if ( dynamic_cast<FireNode*>(atom) ) phases = eventStats[0];
+			else if ( dynamic_cast<FireFront*>(atom) ) phases = eventStats[1];
+			else if ( dynamic_cast<FireDomain*>(atom) ) phases = eventStats[2];
+			start = chrono::steady_clock::now();
+			if ( upEvent->input ){
+				atom->input();
+				tick(phases[0]);
+			}
+			atom->update();
+			tick(phases[1]);
+			atom->timeAdvance();
+			tick(phases[2]);
+			if ( upEvent->output ){
+				atom->output();
+				tick(phases[3]);
+			}
+			upEvent->setNewTime(atom->getUpdateTime());
+			schedule->insert(upEvent);
+			numEvents++;
+		}
+	} catch ( TopologicalException& e ){
+		cout << domain->getDomainID() << ": " << e.what() << endl;
+		domain->restoreValidState();
+		domain->setSafeTopologyMode(true);
+		return true;
+	}
+	return false;
+}
+
+void PLibForeFire::countCall(const string& name, chrono::steady_clock::time_point start){
+	PhaseStats& call = callStats[name];
+	call.calls++;
+	call.time += chrono::duration<double>(chrono::steady_clock::now() - start).count();
+}
+
+void PLibForeFire::goTo(double t){
+	EngineLock lock(engineMutex);
+	activate();
+	goToTime(t);
+}
+
+void PLibForeFire::step(double dt){
+	EngineLock lock(engineMutex);
+	activate();
+	if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+	goToTime(executor->getDomain()->getSimulationTime() + dt);
+}
+
+size_t PLibForeFire::run(double until, double every, py::object callback, char* layer, py::object out){
+	string lname(layer);
+	double* outData = 0;
+	size_t outRows = 0;
+	size_t rowSize = 0;
+	if ( !out.is_none() ){
+		if ( !py::array_t<double, py::array::c_style>::check_(out) ){
+			throw std::invalid_argument("out must be a C contiguous float64 array");
+		}
+		py::array_t<double, py::array::c_style> outArray = out.cast<py::array_t<double, py::array::c_style>>();
+		if ( outArray.ndim() < 1 or !outArray.writeable() ){
+			throw std::invalid_argument("out must be a writeable array with one row per output");
+		}
+		outData = outArray.mutable_data();
+		outRows = outArray.shape(0);
+		rowSize = ( outRows > 0 ) ? outArray.size() / outRows : 0;
+	}
+
+	double startTime;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+		startTime = executor->getDomain()->getSimulationTime();
+	}
+
+	size_t numOutputs = 0;
+	double t = startTime;
+	while ( t < until ){
+		/* output times are computed from the start to avoid drifting */
+		t = ( every > 0 ) ? min(startTime + (numOutputs + 1) * every, until) : until;
+		{
+			py::gil_scoped_release release;
+			EngineLock lock(engineMutex);
+			activate();
+			goToTime(t);
+			if ( outData ){
+				FFArray<double>* srcD = getLayerMatrix(lname, t);
+				if ( srcD == 0 ) throw std::invalid_argument("unknown layer " + lname);
+				if ( numOutputs >= outRows or srcD->getSize() != rowSize ){
+					throw std::invalid_argument("out is too small for the outputs of layer " + lname);
+				}
+				copyToCOrder(srcD, outData + numOutputs * rowSize);
+			}
+		}
+		numOutputs++;
+		if ( !callback.is_none() ){
+			/* a callback returning False stops the run */
+			py::object proceed = callback(t);
+			if ( proceed.ptr() == Py_False ) break;
+		}
+	}
+	return numOutputs;
+}
+
+
+void PLibForeFire::addScalarLayer(char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, double* values){
+
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	string ltype(type);
 
@@ -118,13 +1205,13 @@ void PLibForeFire::addScalarLayer(char *type, char *name, double x0 , double y0,
 	size_t nk = nnz;
 	size_t nl = nnl;
 
- 	pyxecutor->getDomain()->addScalarLayer(type, lname, x0, y0, t0, width, height, timespan, ni, nj, nk, nl, values.mutable_data());
+ 	executor->getDomain()->addScalarLayer(ltype, lname, x0, y0, t0, width, height, timespan, ni, nj, nk, nl, values);
 
 }
 
-void PLibForeFire::addIndexLayer(char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, py::array_t<int> values){
-	FFPoint *p0 = new FFPoint(x0,y0,0);
-	FFPoint *pe = new FFPoint(width,height,0);
+void PLibForeFire::addIndexLayer(char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, int* values){
+	EngineLock lock(engineMutex);
+	activate();
 	string lname(name);
 	string ltype(type);
 
@@ -133,102 +1220,654 @@ void PLibForeFire::addIndexLayer(char *type, char *name, double x0 , double y0,
 	size_t nk = nnz;
 	size_t nl = nnl;
 
- 	pyxecutor->getDomain()->addIndexLayer(ltype, lname, x0, y0, t0, width, height, timespan, ni, nj, nk, nl, values.mutable_data());
+ 	executor->getDomain()->addIndexLayer(ltype, lname, x0, y0, t0, width, height, timespan, ni, nj, nk, nl, values);
 }
 
-py::array_t<double> PLibForeFire::getDoubleArray(char* name){
-	double lTime = pyxecutor->getDomain()->getSimulationTime();
+FFArray<double>* PLibForeFire::getLayerMatrix(const string& name, double t){
+	FFArray<double>* srcD = 0;
+	if ( executor->getDomain() == 0 ) return srcD;
+	FluxLayer<double>* myFluxLayer = executor->getDomain()->getFluxLayer(name);
+	if ( myFluxLayer ){
+		myFluxLayer->getMatrix(&srcD, t);
+		return srcD;
+	}
+	DataLayer<double>* myDataLayer = executor->getDomain()->getDataLayer(name);
+	if ( myDataLayer ) myDataLayer->getMatrix(&srcD, t);
+	return srcD;
+}
 
-	return PLibForeFire::getDoubleArray(name, lTime);
+py::array_t<double> PLibForeFire::getDoubleArray(char* name){
+	return PLibForeFire::getDoubleArray(name, true, vector<double>(), 1, "");
 }
 
 py::array_t<double> PLibForeFire::getDoubleArray(char* name, double t){
+	return PLibForeFire::getDoubleArray(name, t, true, vector<double>(), 1, "");
+}
+
+py::array_t<double> PLibForeFire::getDoubleArray(char* name, bool copy
+		, const vector<double>& window, size_t stride, const string& reduce){
+	double lTime;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+		lTime = executor->getDomain()->getSimulationTime();
+	}
+	return PLibForeFire::getDoubleArray(name, lTime, copy, window, stride, reduce);
+}
+
+py::array_t<double> PLibForeFire::getDoubleArray(char* name, double t, bool copy
+		, const vector<double>& window, size_t stride, const string& reduce){
 	string lname(name);
-	FluxLayer<double>* myFluxLayer = pyxecutor->getDomain()->getFluxLayer(lname);
-
-		if ( myFluxLayer ){
-			FFArray<double>* srcD;
-			myFluxLayer->getMatrix(&srcD, t);
-			double* data = srcD->getData();
-			int nnx = srcD->getDim("x");
-			int nny = srcD->getDim("y");
-			int nnz = srcD->getDim("z");
-			int nnt = srcD->getDim("t");
-            constexpr size_t stride_size = sizeof(double);
-            size_t total_size = static_cast<size_t>(nnx) * nny * nnz * nnt;
-             
-             // Temporary vector to hold reshaped data
-             std::vector<double> reshaped_data(total_size);
-             
-             // Reshape data from C to Fortran order
-             for (int t = 0; t < nnt; ++t) {
-                 for (int z = 0; z < nnz; ++z) {
-                     for (int y = 0; y < nny; ++y) {
-                         for (int x = 0; x < nnx; ++x) {
-                             size_t c_index = x + nnx * (y + nny * (z + nnz * t)); // C order index
-                             size_t fortran_index = t + nnt * (z + nnz * (y + nny * x)); // Fortran order index
-                             reshaped_data[c_index] = data[fortran_index];
-                         }
-                     }
-                 }
-             }
-             
-             // Create py::array_t from the reshaped data
-             py::array_t<double> arr(
-                 {nnt, nnz, nny, nnx}, // shape as requested
-                 reshaped_data.data() // Now directly use reshaped data
-             );
-			return arr;
-		}
-
-	DataLayer<double>* myDataLayer = pyxecutor->getDomain()->getDataLayer(lname);
-
-		if ( myDataLayer ){
-			FFArray<double>* srcD;
-			myDataLayer->getMatrix(&srcD, t);
-			double* data = srcD->getData();
-			int nnx = srcD->getDim("x");
-			int nny = srcD->getDim("y");
-			int nnz = srcD->getDim("z");
-			int nnt = srcD->getDim("t");
-            constexpr size_t stride_size = sizeof(double);
-            size_t total_size = static_cast<size_t>(nnx) * nny * nnz * nnt;
-             
-             // Temporary vector to hold reshaped data
-             std::vector<double> reshaped_data(total_size);
-             
-             // Reshape data from C to Fortran order
-             for (int t = 0; t < nnt; ++t) {
-                 for (int z = 0; z < nnz; ++z) {
-                     for (int y = 0; y < nny; ++y) {
-                         for (int x = 0; x < nnx; ++x) {
-                             size_t c_index = x + nnx * (y + nny * (z + nnz * t)); // C order index
-                             size_t fortran_index = t + nnt * (z + nnz * (y + nny * x)); // Fortran order index
-                             reshaped_data[c_index] = data[fortran_index];
-                         }
-                     }
-                 }
-             }
-             
-             // Create py::array_t from the reshaped data
-             py::array_t<double> arr(
-                 {nnt, nnz, nny, nnx}, // shape as requested
-                 reshaped_data.data() // Now directly use reshaped data
-             );
-             
-             return arr;
-			
-			
-			
-		}
-
-		double* data = NULL;
+	double* data = 0;
+	double* values = 0;
+	FireDomain* domain = 0;
+	ssize_t nnx = 0, nny = 0, nnz = 0, nnt = 0;
+	ssize_t i0 = 0, i1 = 0, j0 = 0, j1 = 0;
+	ssize_t k = stride;
+
+	if ( !window.empty() and (window.size() != 4 or window[2] <= window[0] or window[3] <= window[1]) ){
+		throw std::invalid_argument("window must be (x0, y0, x1, y1) with x0 < x1 and y0 < y1");
+	}
+	if ( stride == 0 ) throw std::invalid_argument("stride must be at least 1");
+	int reduction = blockReduction(reduce);
+	if ( reduction != noReduction and !copy ) throw std::invalid_argument("reduce needs copy=True");
+
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		chrono::steady_clock::time_point start;
+		if ( profiling ) start = chrono::steady_clock::now();
+		FFArray<double>* srcD = getLayerMatrix(lname, t);
+		if ( profiling ) countCall("getDoubleArray[" + lname + "]", start);
+		if ( srcD ){
+			data = srcD->getData();
+			nnx = srcD->getDim("x");
+			nny = srcD->getDim("y");
+			nnz = srcD->getDim("z");
+			nnt = srcD->getDim("t");
+			/* cells of the window, the matrix covering the domain */
+			i1 = nnx;
+			j1 = nny;
+			if ( !window.empty() ){
+				FFPoint swCorner = executor->getDomain()->getSWCorner();
+				FFPoint neCorner = executor->getDomain()->getNECorner();
+				double dx = (neCorner.getX() - swCorner.getX()) / nnx;
+				double dy = (neCorner.getY() - swCorner.getY()) / nny;
+				i0 = max(ssize_t(0), min(nnx, (ssize_t) floor((window[0] - swCorner.getX()) / dx)));
+				i1 = max(i0, min(nnx, (ssize_t) ceil((window[2] - swCorner.getX()) / dx)));
+				j0 = max(ssize_t(0), min(nny, (ssize_t) floor((window[1] - swCorner.getY()) / dy)));
+				j1 = max(j0, min(nny, (ssize_t) ceil((window[3] - swCorner.getY()) / dy)));
+			}
+			/* copies are made while the engine is held, the layer may
+			 * change as soon as it is released */
+			if ( !copy ){
+				/* views keep the domain holding the layer */
+				domain = executor->getDomain();
+				viewedDomains[domain].views++;
+			} else {
+				ssize_t nox = (i1 - i0 + k - 1) / k;
+				ssize_t noy = (j1 - j0 + k - 1) / k;
+				values = new double[nnt * nnz * noy * nox];
+				if ( nox == nnx and noy == nny ){
+					copyToCOrder(srcD, values);
+				} else {
+					copyWindow(srcD, i0, i1, j0, j1, k, reduction, values);
+				}
+			}
+		}
+	}
+
+	if ( data == 0 ){
 		py::array_t<double> arr = py::array_t<double>(
 			{0, 0, 0}, // shape
 			{8, 8, 8},
 			data
 		);
 		return arr;
+	}
+
+	ssize_t nox = (i1 - i0 + k - 1) / k;
+	ssize_t noy = (j1 - j0 + k - 1) / k;
+
+	if ( !copy ){
+		/* FFArrays are stored with x varying slowest and t fastest, the
+		 * layer buffer is exposed as is with the matching strides */
+		constexpr ssize_t s = sizeof(double);
+		py::capsule owner(domain, releaseView);
+		py::array_t<double> view(
+			{nnt, nnz, noy, nox},
+			{s, s * nnt, s * nnt * nnz * k, s * nnt * nnz * nny * k},
+			data + nnt * nnz * (j0 + nny * i0), owner
+		);
+		view.attr("setflags")(py::arg("write") = false);
+		return view;
+	}
+
+	/* the copy is handed to NumPy, which frees it with the array */
+	py::capsule owner(values, [](void* p){ delete[] static_cast<double*>(p); });
+	return py::array_t<double>({nnt, nnz, noy, nox}, values, owner);
+}
+
+size_t PLibForeFire::updateLayer(char* name, py::array values){
+	string lname(name);
+	size_t nx, ny, nz, nt;
+	auto data = layerValues<double>(values, nx, ny, nz, nt);
+	// bytes copied to reach the engine layout, none for Fortran ordered doubles
+	size_t moved = ( data.ptr() == values.ptr() ) ? 0 : data.nbytes();
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+		/* only array layers hand out their own storage, other layers
+		 * return a matrix computed on request */
+		XYZTDataLayer<double>* layer = dynamic_cast<XYZTDataLayer<double>*>(executor->getDomain()->getDataLayer(lname));
+		if ( layer == 0 ) throw std::invalid_argument("no scalar array layer named " + lname);
+		FFArray<double>* dstD = 0;
+		layer->getMatrix(&dstD, executor->getDomain()->getSimulationTime());
+		if ( (size_t) dstD->getDim("x") != nx or (size_t) dstD->getDim("y") != ny
+				or (size_t) dstD->getDim("z") != nz or (size_t) dstD->getDim("t") != nt ){
+			ostringstream msg;
+			msg << "layer " << lname << " is shaped (" << dstD->getDim("t") << ", " << dstD->getDim("z")
+				<< ", " << dstD->getDim("y") << ", " << dstD->getDim("x") << ")";
+			throw std::invalid_argument(msg.str());
+		}
+		copy(data.data(), data.data() + data.size(), dstD->getData());
+	}
+
+	/* restore() has to start from the latest values of the layer */
+	size_t i = setup.size();
+	while ( i > 0 and !((setup[i - 1].call == "addScalarLayer" or setup[i - 1].call == "updateLayer")
+			and setup[i - 1].names.back() == lname) ) i--;
+	if ( i > 0 ){
+		setup[i - 1].values = recordedArray(values, data);
+	} else {
+		SetupRecord update;
+		update.call = "updateLayer";
+		update.names.push_back(lname);
+		update.values = recordedArray(values, data);
+		setup.push_back(std::move(update));
+	}
+	return moved;
+}
+
+/* rows of (x, y) or (x, y, z) coordinates */
+static size_t pointsDimension(py::array_t<double, py::array::c_style | py::array::forcecast>& points){
+	if ( points.ndim() != 2 or points.shape(1) < 2 or points.shape(1) > 3 ){
+		throw std::invalid_argument("points must be shaped (n, 2) or (n, 3)");
+	}
+	return points.shape(1);
+}
+
+size_t PLibForeFire::startFires(py::array_t<double, py::array::c_style | py::array::forcecast> points, py::object times){
+	size_t dim = pointsDimension(points);
+	size_t numFires = points.shape(0);
+	const double* loc = points.data();
+
+	py::array_t<double, py::array::c_style | py::array::forcecast> fireTimes;
+	const double* t = 0;
+	if ( !times.is_none() ){
+		fireTimes = py::array_t<double, py::array::c_style | py::array::forcecast>::ensure(times);
+		if ( !fireTimes ) throw py::error_already_set();
+		if ( fireTimes.size() != 1 and (size_t) fireTimes.size() != numFires ){
+			throw std::invalid_argument("times must be a single time or one time per point");
+		}
+		t = fireTimes.data();
+	}
+	size_t timeStride = ( t and fireTimes.size() > 1 ) ? 1 : 0;
+
+	py::gil_scoped_release release;
+	EngineLock lock(engineMutex);
+	activate();
+	if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+	for ( size_t i = 0; i < numFires; i++ ){
+		ostringstream command;
+		command.precision(numeric_limits<double>::max_digits10);
+		command << "startFire[loc=(" << loc[dim*i] << "," << loc[dim*i+1] << ","
+				<< ( dim == 3 ? loc[dim*i+2] : 0. ) << ")";
+		/* without time, fires start at the current time of the domain */
+		if ( t ) command << ";t=" << t[i*timeStride];
+		command << "]";
+		executeCommand(command.str());
+	}
+	return numFires;
+}
+
+long PLibForeFire::addFront(py::array_t<double, py::array::c_style | py::array::forcecast> nodes, double t){
+	size_t dim = pointsDimension(nodes);
+	size_t numNodes = nodes.shape(0);
+	const double* loc = nodes.data();
+	if ( numNodes < 3 ) throw std::invalid_argument("a front needs at least 3 nodes");
+	/* ForeFire expects the nodes of a front clockwise, the burning side on
+	 * their right : counter-clockwise rings, of positive area, are reversed */
+	double area = 0;
+	for ( size_t i = 0; i < numNodes; i++ ){
+		size_t j = (i + 1) % numNodes;
+		area += loc[dim*i] * loc[dim*j+1] - loc[dim*j] * loc[dim*i+1];
+	}
+	if ( area == 0 or !std::isfinite(area) ) throw std::invalid_argument("front nodes must enclose an area");
+	bool reversed = area > 0;
+
+	py::gil_scoped_release release;
+	EngineLock lock(engineMutex);
+	activate();
+	if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+	long domainID = executor->getDomain()->getDomainID();
+
+	/* the front is built through the commands, which keep track of the
+	 * front and nodes being read, it is completed on the next step */
+	ostringstream command;
+	command.precision(numeric_limits<double>::max_digits10);
+	command << "\tFireFront[domain=" << domainID << ";t=" << t << "]";
+	executeCommand(command.str());
+	long frontID = session->ff->getShortID();
+	for ( size_t k = 0; k < numNodes; k++ ){
+		size_t i = reversed ? numNodes - 1 - k : k;
+		command.str("");
+		command << "\t\tFireNode[domain=" << domainID << ";loc=(" << loc[dim*i] << "," << loc[dim*i+1] << ","
+				<< ( dim == 3 ? loc[dim*i+2] : 0. ) << ");vel=(0,0,0);t=" << t << ";state=init;frontId=" << frontID << "]";
+		executeCommand(command.str());
+	}
+	return frontID;
+}
+
+py::array_t<double> PLibForeFire::sample(char* name, py::array_t<double, py::array::c_style | py::array::forcecast> points, py::object t){
+	string lname(name);
+	size_t dim = pointsDimension(points);
+	size_t numPoints = points.shape(0);
+	const double* loc = points.data();
+	bool atTime = !t.is_none();
+	double time = atTime ? t.cast<double>() : 0.;
+	py::array_t<double> values(numPoints);
+	double* value = values.mutable_data();
+
+	py::gil_scoped_release release;
+	EngineLock lock(engineMutex);
+	activate();
+	if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+	/* values come from the interpolation of the layer itself */
+	DataLayer<double>* layer = executor->getDomain()->getFluxLayer(lname);
+	if ( layer == 0 ) layer = executor->getDomain()->getDataLayer(lname);
+	if ( layer == 0 ) throw std::invalid_argument("no layer named " + lname);
+	if ( !atTime ) time = executor->getDomain()->getSimulationTime();
+	for ( size_t i = 0; i < numPoints; i++ ){
+		FFPoint point(loc[dim*i], loc[dim*i+1], ( dim == 3 ) ? loc[dim*i+2] : 0.);
+		value[i] = layer->getValueAt(point, time);
+	}
+	return values;
+}
+
+/* Counts the points burnt since the previous scan with this tracker,
+ * only the cells of the domain holding a burning map and with points
+ * left to account for are scanned */
+void PLibForeFire::scanBurned(BurnTracker& tracker, vector<long>* index, vector<double>* times){
+	FireDomain* domain = executor->getDomain();
+	size_t atmoNX = params->getInt("atmoNX");
+	size_t atmoNY = params->getInt("atmoNY");
+	size_t localNX = params->getInt("localBMapSizeX");
+	size_t localNY = params->getInt("localBMapSizeY");
+	size_t nx = atmoNX * localNX;
+	if ( domain != tracker.domain or tracker.points.size() != nx * atmoNY * localNY ){
+		tracker.domain = domain;
+		tracker.points.assign(nx * atmoNY * localNY, 0);
+		tracker.cells.assign(atmoNX * atmoNY, 0);
+		tracker.burned = 0;
+	}
+	FDCell** cells = domain->getCells();
+	for ( size_t ci = 0; ci < atmoNX; ci++ ){
+		for ( size_t cj = 0; cj < atmoNY; cj++ ){
+			FDCell& cell = cells[ci][cj];
+			if ( tracker.cells[ci * atmoNY + cj] or !cell.isActive() ) continue;
+			bool complete = true;
+			for ( size_t lj = 0; lj < localNY; lj++ ){
+				size_t j = cj * localNY + lj;
+				for ( size_t li = 0; li < localNX; li++ ){
+					size_t i = ci * localNX + li;
+					if ( tracker.points[j * nx + i] ) continue;
+					double arrivalTime = cell.getArrivalTime(li, lj);
+					if ( arrivalTime == numeric_limits<double>::infinity() ){
+						complete = false;
+						continue;
+					}
+					tracker.points[j * nx + i] = 1;
+					tracker.burned++;
+					if ( index ){
+						index->push_back(j);
+						index->push_back(i);
+						times->push_back(arrivalTime);
+					}
+				}
+			}
+			if ( complete ) tracker.cells[ci * atmoNY + cj] = 1;
+		}
+	}
+}
+
+py::dict PLibForeFire::getNewlyBurned(){
+	vector<long> index;
+	vector<double> times;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() == 0 ) throw std::runtime_error("no FireDomain defined");
+		scanBurned(feed, &index, &times);
+	}
+
+	py::dict burned;
+	burned["index"] = py::array_t<long>({(ssize_t) times.size(), (ssize_t) 2}, index.data());
+	burned["time"] = py::array_t<double>(times.size(), times.data());
+	return burned;
+}
+
+static const char* diagnosticNames[] = {"time", "area", "perimeter", "fronts", "nodes", "minROS", "meanROS", "maxROS"};
+static const size_t numDiagnosticNames = sizeof(diagnosticNames) / sizeof(diagnosticNames[0]);
+
+void PLibForeFire::recordDiagnostics(){
+	FireDomain* domain = executor->getDomain();
+	scanBurned(burnedArea, 0, 0);
+	size_t nx = params->getInt("atmoNX") * params->getInt("localBMapSizeX");
+	size_t ny = params->getInt("atmoNY") * params->getInt("localBMapSizeY");
+	double pointArea = (domain->getNECorner().getX() - domain->getSWCorner().getX()) / nx
+			* (domain->getNECorner().getY() - domain->getSWCorner().getY()) / ny;
+
+	FrontsSummary summary = {0., 0, 0, numeric_limits<double>::infinity(), 0., 0.};
+	FireFront* domainFront = domain->getDomainFront();
+	summarizeFronts(domainFront, domainFront, summary);
+	if ( summary.nodes == 0 ) summary.minROS = 0.;
+
+	double* row = &diagnostics[(numDiagnostics % diagnosticsCapacity) * numDiagnosticNames];
+	row[0] = domain->getSimulationTime();
+	row[1] = burnedArea.burned * pointArea;
+	row[2] = summary.perimeter;
+	row[3] = summary.fronts;
+	row[4] = summary.nodes;
+	row[5] = summary.minROS;
+	row[6] = ( summary.nodes > 0 ) ? summary.sumROS / summary.nodes : 0.;
+	row[7] = summary.maxROS;
+	numDiagnostics++;
+}
+
+void PLibForeFire::enableDiagnostics(size_t capacity){
+	EngineLock lock(engineMutex);
+	diagnosticsCapacity = capacity;
+	numDiagnostics = 0;
+	diagnostics.assign(capacity * numDiagnosticNames, 0.);
+}
+
+py::dict PLibForeFire::getDiagnostics(){
+	vector<double> rows;
+	size_t numRows = 0;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		/* oldest row first */
+		numRows = min(numDiagnostics, diagnosticsCapacity);
+		size_t first = numDiagnostics - numRows;
+		rows.reserve(numRows * numDiagnosticNames);
+		for ( size_t k = first; k < numDiagnostics; k++ ){
+			double* row = &diagnostics[(k % diagnosticsCapacity) * numDiagnosticNames];
+			rows.insert(rows.end(), row, row + numDiagnosticNames);
+		}
+	}
+
+	py::dict columns;
+	for ( size_t c = 0; c < numDiagnosticNames; c++ ){
+		py::array_t<double> column(numRows);
+		double* data = column.mutable_data();
+		for ( size_t k = 0; k < numRows; k++ ) data[k] = rows[k * numDiagnosticNames + c];
+		columns[diagnosticNames[c]] = column;
+	}
+	return columns;
+}
+
+py::dict PLibForeFire::getFronts(){
+	FrontNodes nodes;
+	nodes.offsets.push_back(0);
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() != 0 ){
+			FireFront* domainFront = executor->getDomain()->getDomainFront();
+			collectFronts(domainFront, domainFront, 0, nodes);
+		}
+	}
+
+	return frontArrays(nodes, false);
+}
+
+py::dict PLibForeFire::snapshot(){
+	dropClearedSetup();
+	map<string, string> parameters;
+	FrontNodes fronts;
+	fronts.offsets.push_back(0);
+	vector<double> arrivalTimes;
+	ssize_t nx = 0, ny = 0;
+	double time = 0;
+	double referenceTime = 0;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		parameters = captureParameters(params);
+		referenceTime = executor->refTime;
+		FireDomain* domain = executor->getDomain();
+		if ( domain != 0 ){
+			time = domain->getSimulationTime();
+			FireFront* domainFront = domain->getDomainFront();
+			collectFronts(domainFront, domainFront, 0, fronts);
+			DataLayer<double>* bmap = domain->getDataLayer("BMap");
+			FFArray<double>* srcD = 0;
+			if ( bmap ) bmap->getMatrix(&srcD, time);
+			if ( srcD ){
+				nx = srcD->getDim("x");
+				ny = srcD->getDim("y");
+				arrivalTimes.resize(nx * ny);
+				for ( ssize_t j = 0; j < ny; j++ ){
+					for ( ssize_t i = 0; i < nx; i++ ){
+						arrivalTimes[j * nx + i] = domain->getArrivalTime(i, j);
+					}
+				}
+			}
+		}
+	}
+
+	py::list records;
+	for ( size_t i = 0; i < setup.size(); i++ ){
+		py::list record;
+		record.append(setup[i].call);
+		for ( size_t k = 0; k < setup[i].names.size(); k++ ) record.append(setup[i].names[k]);
+		for ( size_t k = 0; k < setup[i].box.size(); k++ ) record.append(setup[i].box[k]);
+		if ( setup[i].values ) record.append(setup[i].values);
+		records.append(py::tuple(record));
+	}
+
+	py::dict snap;
+	snap["parameters"] = parameters;
+	snap["setup"] = records;
+	snap["fronts"] = frontArrays(fronts, true);
+	snap["arrivalTimes"] = py::array_t<double>({ny, nx}, arrivalTimes.data());
+	snap["time"] = time;
+	snap["referenceTime"] = referenceTime;
+	return snap;
+}
+
+void PLibForeFire::restore(py::dict snap){
+	map<string, string> parameters = snap["parameters"].cast<map<string, string>>();
+	py::list records = snap["setup"].cast<py::list>();
+	FrontNodes fronts = restartableFronts(snap["fronts"].cast<py::dict>());
+	py::array_t<double, py::array::c_style | py::array::forcecast> arrivalTimes = snap["arrivalTimes"].cast<py::array_t<double, py::array::c_style | py::array::forcecast>>();
+	double time = snap["time"].cast<double>();
+	double referenceTime = snap["referenceTime"].cast<double>();
+
+	/* starting from an empty session with the parameters of the snapshot */
+	setup.clear();
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		if ( executor->getDomain() != 0 ) executeCommand("clear");
+		installParameters(params, parameters);
+	}
+
+	/* replaying the calls that built the domain */
+	for ( size_t i = 0; i < records.size(); i++ ){
+		py::tuple record = records[i].cast<py::tuple>();
+		string call = record[0].cast<string>();
+		if ( call == "execute" ){
+			string command = record[1].cast<string>();
+			py::gil_scoped_release release;
+			EngineLock lock(engineMutex);
+			activate();
+			executeCommand(command);
+		} else if ( call == "addLayer" ){
+			string type = record[1].cast<string>();
+			string layername = record[2].cast<string>();
+			string keyname = record[3].cast<string>();
+			py::gil_scoped_release release;
+			addLayer(&type[0], &layername[0], &keyname[0]);
+		} else if ( call == "addScalarLayer" or call == "addIndexLayer" ){
+			string type = record[1].cast<string>();
+			string name = record[2].cast<string>();
+			double box[6];
+			for ( size_t k = 0; k < 6; k++ ) box[k] = record[3 + k].cast<double>();
+			py::array values = record[9].cast<py::array>();
+			if ( call == "addScalarLayer" ){
+				loadScalarLayer(*this, &type[0], &name[0], box[0], box[1], box[2], box[3], box[4], box[5], values);
+			} else {
+				loadIndexLayer(*this, &type[0], &name[0], box[0], box[1], box[2], box[3], box[4], box[5], values);
+			}
+		} else if ( call == "updateLayer" ){
+			string name = record[1].cast<string>();
+			updateLayer(&name[0], record[2].cast<py::array>());
+		} else if ( call == "setFuelsTable" ){
+			loadFuelsTable(*this, record[1].cast<py::array>());
+		} else {
+			throw std::invalid_argument("unknown setup call " + call);
+		}
+	}
+
+	dropClearedSetup();
+
+	/* fronts, burnt area and time */
+	const double* arrivalData = arrivalTimes.data();
+	size_t ny = ( arrivalTimes.ndim() == 2 ) ? arrivalTimes.shape(0) : 0;
+	size_t nx = ( arrivalTimes.ndim() == 2 ) ? arrivalTimes.shape(1) : 0;
+	py::gil_scoped_release release;
+	EngineLock lock(engineMutex);
+	activate();
+	installParameters(params, parameters);
+	FireDomain* domain = executor->getDomain();
+	if ( domain == 0 ) return;
+	vector<string> frontLines = frontCommands(fronts, domain->getDomainID());
+	for ( size_t k = 0; k < frontLines.size(); k++ ) executeCommand(frontLines[k]);
+	/* FireDomain::setArrivalTime is private, the burning matrices of
+	 * the cells are written the same way it does, for burnt points only */
+	FDCell** cells = domain->getCells();
+	size_t localNX = params->getInt("localBMapSizeX");
+	size_t localNY = params->getInt("localBMapSizeY");
+	for ( size_t j = 0; j < ny; j++ ){
+		for ( size_t i = 0; i < nx; i++ ){
+			double arrivalTime = arrivalData[j * nx + i];
+			if ( arrivalTime == numeric_limits<double>::infinity() ) continue;
+			cells[i / localNX][j / localNY].setArrivalTime(i % localNX, j % localNY, arrivalTime);
+		}
+	}
+	domain->setTime(time);
+	executor->setStartTime(time);
+	executor->setReferenceTime(referenceTime);
+}
+
+void PLibForeFire::enableStats(bool enable){
+	EngineLock lock(engineMutex);
+	profiling = enable;
+}
+
+py::dict PLibForeFire::stats(bool reset){
+	static const char* atoms[] = {"FireNode", "FireFront", "FireDomain", "other"};
+	static const char* phases[] = {"input", "update", "timeAdvance", "output"};
+	map<string, PhaseStats> calls;
+	map<string, PhaseStats> events;
+	size_t processed = 0;
+	size_t numNodes = 0, numFronts = 0;
+	{
+		py::gil_scoped_release release;
+		EngineLock lock(engineMutex);
+		activate();
+		calls = callStats;
+		processed = numEvents;
+		for ( size_t k = 0; k < 4; k++ ){
+			for ( size_t l = 0; l < 4; l++ ){
+				if ( eventStats[k][l].calls > 0 ) events[string(atoms[k]) + "." + phases[l]] = eventStats[k][l];
+			}
+		}
+		if ( executor->getDomain() != 0 ){
+			FireFront* domainFront = executor->getDomain()->getDomainFront();
+			countFronts(domainFront, domainFront, numNodes, numFronts);
+		}
+		if ( reset ){
+			callStats.clear();
+			numEvents = 0;
+			for ( size_t k = 0; k < 4; k++ ){
+				for ( size_t l = 0; l < 4; l++ ) eventStats[k][l] = PhaseStats();
+			}
+		}
+	}
+
+	py::dict phaseStats, callStatsDict;
+	map<string, PhaseStats>::iterator it;
+	for ( it = events.begin(); it != events.end(); ++it ){
+		phaseStats[py::str(it->first)] = py::dict(py::arg("calls") = it->second.calls, py::arg("time") = it->second.time);
+	}
+	for ( it = calls.begin(); it != calls.end(); ++it ){
+		callStatsDict[py::str(it->first)] = py::dict(py::arg("calls") = it->second.calls, py::arg("time") = it->second.time);
+	}
+	py::dict result;
+	result["enabled"] = profiling;
+	result["events"] = processed;
+	result["phases"] = phaseStats;
+	result["calls"] = callStatsDict;
+	result["nodes"] = numNodes;
+	result["fronts"] = numFronts;
+	return result;
+}
+
+/* Pickled arrival times only keep the burnt points : their shape,
+ * flat indices and arrival times */
+static py::tuple packArrivalTimes(py::array_t<double, py::array::c_style | py::array::forcecast> arrivalTimes){
+	const double* data = arrivalTimes.data();
+	vector<int64_t> indices;
+	vector<double> values;
+	for ( ssize_t k = 0; k < arrivalTimes.size(); k++ ){
+		if ( data[k] == numeric_limits<double>::infinity() ) continue;
+		indices.push_back(k);
+		values.push_back(data[k]);
+	}
+	py::tuple shape(arrivalTimes.ndim());
+	for ( ssize_t k = 0; k < arrivalTimes.ndim(); k++ ) shape[k] = arrivalTimes.shape(k);
+	return py::make_tuple(shape
+			, py::array_t<int64_t>(indices.size(), indices.data())
+			, py::array_t<double>(values.size(), values.data()));
+}
+
+static py::array_t<double> unpackArrivalTimes(py::tuple packed){
+	vector<ssize_t> shape = packed[0].cast<vector<ssize_t>>();
+	py::array_t<int64_t, py::array::c_style | py::array::forcecast> indices = packed[1].cast<py::array_t<int64_t, py::array::c_style | py::array::forcecast>>();
+	py::array_t<double, py::array::c_style | py::array::forcecast> values = packed[2].cast<py::array_t<double, py::array::c_style | py::array::forcecast>>();
+	py::array_t<double> arrivalTimes(shape);
+	double* data = arrivalTimes.mutable_data();
+	fill(data, data + arrivalTimes.size(), numeric_limits<double>::infinity());
+	for ( ssize_t k = 0; k < indices.size(); k++ ){
+		if ( indices.data()[k] < 0 or indices.data()[k] >= arrivalTimes.size() ){
+			throw std::runtime_error("corrupted ForeFire state");
+		}
+		data[indices.data()[k]] = values.data()[k];
+	}
+	return arrivalTimes;
 }
 
 PYBIND11_MODULE(_pyforefire, m) {
@@ -236,126 +1875,126 @@ PYBIND11_MODULE(_pyforefire, m) {
 
     py::class_<PLibForeFire>(m, "ForeFire")
         .def(py::init())
-		.def("createDomain", &PLibForeFire::createDomain)
-        .def("addLayer", &PLibForeFire::addLayer)
-		.def("setInt", &PLibForeFire::setInt)
-		.def("getInt", &PLibForeFire::getInt)
-		.def("getInt", &PLibForeFire::getInt)
-		.def("setDouble", &PLibForeFire::setDouble)
-		.def("getDouble", &PLibForeFire::getDouble)
-		.def("setString", &PLibForeFire::setString)
-		.def("getString", &PLibForeFire::getString)
-		.def("execute", &PLibForeFire::execute)
-		.def("addScalarLayer", [](PLibForeFire& self, char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, py::array_t<double> values) {
-            size_t nn[] = {1, 1, 1, 1};
-            const long* shape = values.shape();
-        
-            for (ssize_t i = 0; i < values.ndim(); i += 1) {
-                nn[i] = (size_t)*shape;
-                ++shape;
-            }
-        
-            // Assuming nn contains the dimensions in Fortran (column-major) order
-            size_t nx = nn[3], ny = nn[2], nz = nn[1], nnt = nn[0];
-            size_t size = nnt * nz * ny * nx;
-            auto dataC = std::vector<double>(size); // C-style array
-        
-            auto r = values.unchecked<4>(); // Assuming values is a 4D array; use unchecked for read-only access
-        
-            for (size_t ll = 0; ll < nnt; ++ll) {
-                for (size_t kk = 0; kk < nz; ++kk) {
-                    for (size_t jj = 0; jj < ny; ++jj) {
-                        for (size_t ii = 0; ii < nx; ++ii) {
-                            // Convert Fortran index to C index on the fly
-                            size_t indF = ll * (nx * ny * nz) + kk * (nx * ny) + jj * nx + ii;
-                            size_t indC = ii * (ny * nz * nnt) + jj * (nz * nnt) + kk * nnt + ll;
-        
-                            // No temporary array; direct assignment
-                            dataC[indC] = r(ll, kk, jj, ii); // Use the indices according to Fortran order in r()
-                        }
-                    }
-                }
-            }
-        
-            // Pass the reshaped data to the original addIndexLayer function
-            // Need to convert dataC back to a format that addIndexLayer expects (e.g., py::array)
-            py::array_t<double> dataC_py = py::array(size, dataC.data());
-            return self.addScalarLayer(type, name, x0, y0, t0, width, height, timespan, nx, ny, nz, nnt, dataC_py);
-                                                                                        
- 
+		.def("createDomain", &PLibForeFire::createDomain, py::call_guard<py::gil_scoped_release>())
+        .def("addLayer", &PLibForeFire::addLayer, py::call_guard<py::gil_scoped_release>())
+		.def("setInt", &PLibForeFire::setInt, py::call_guard<py::gil_scoped_release>())
+		.def("getInt", &PLibForeFire::getInt, py::call_guard<py::gil_scoped_release>())
+		.def("getInt", &PLibForeFire::getInt, py::call_guard<py::gil_scoped_release>())
+		.def("setDouble", &PLibForeFire::setDouble, py::call_guard<py::gil_scoped_release>())
+		.def("getDouble", &PLibForeFire::getDouble, py::call_guard<py::gil_scoped_release>())
+		.def("setString", &PLibForeFire::setString, py::call_guard<py::gil_scoped_release>())
+		.def("getString", &PLibForeFire::getString, py::call_guard<py::gil_scoped_release>())
+		.def("execute", [](PLibForeFire& self, char* command) {
+			string output;
+			{
+				py::gil_scoped_release release;
+				output = self.execute(command);
+			}
+			self.dropClearedSetup();
+			return output;
 		})
-		.def("addIndexLayer", [](PLibForeFire& self, char *type, char *name, double x0 , double y0, double t0, double width , double height, double timespan, py::array_t<int> values) {
-            size_t nn[] = {1, 1, 1, 1};
-            const long* shape = values.shape();
-        
-            for (ssize_t i = 0; i < values.ndim(); i += 1) {
-                nn[i] = (size_t)*shape;
-                ++shape;
-            }
-        
-            // Assuming nn contains the dimensions in Fortran (column-major) order
-            size_t nx = nn[3], ny = nn[2], nz = nn[1], nnt = nn[0];
-            size_t size = nnt * nz * ny * nx;
-            auto dataC = std::vector<int>(size); // C-style array
-        
-            auto r = values.unchecked<4>(); // Assuming values is a 4D array; use unchecked for read-only access
-        
-            for (size_t ll = 0; ll < nnt; ++ll) {
-                for (size_t kk = 0; kk < nz; ++kk) {
-                    for (size_t jj = 0; jj < ny; ++jj) {
-                        for (size_t ii = 0; ii < nx; ++ii) {
-                            // Convert Fortran index to C index on the fly
-                            size_t indF = ll * (nx * ny * nz) + kk * (nx * ny) + jj * nx + ii;
-                            size_t indC = ii * (ny * nz * nnt) + jj * (nz * nnt) + kk * nnt + ll;
-        
-                            // No temporary array; direct assignment
-                            dataC[indC] = r(ll, kk, jj, ii); // Use the indices according to Fortran order in r()
-                        }
-                    }
-                }
-            }
-        
-            // Pass the reshaped data to the original addIndexLayer function
-            // Need to convert dataC back to a format that addIndexLayer expects (e.g., py::array)
-            py::array_t<int> dataC_py = py::array(size, dataC.data());
-            return self.addIndexLayer(type, name, x0, y0, t0, width, height, timespan, nx, ny, nz, nnt, dataC_py);
-
+		.def("executeBatch", &PLibForeFire::executeBatch, py::arg("commands"))
+		.def("goTo", &PLibForeFire::goTo, py::arg("t"), py::call_guard<py::gil_scoped_release>())
+		.def("step", &PLibForeFire::step, py::arg("dt"), py::call_guard<py::gil_scoped_release>())
+		.def("run", &PLibForeFire::run, py::arg("until"), py::arg("every") = 0.
+				, py::arg("callback") = py::none(), py::arg("layer") = "BMap", py::arg("out") = py::none())
+		.def("addScalarLayer", &loadScalarLayer)
+		.def("addIndexLayer", &loadIndexLayer)
+		.def("updateLayer", &PLibForeFire::updateLayer, py::arg("name"), py::arg("values"))
+		.def("getDoubleArray", [](PLibForeFire& self, char* name, bool copy, py::object t
+				, py::object window, size_t stride, py::object reduce) {
+			vector<double> box;
+			if ( !window.is_none() ) box = window.cast<vector<double>>();
+			string how = reduce.is_none() ? "" : reduce.cast<string>();
+			if ( t.is_none() ) return self.getDoubleArray(name, copy, box, stride, how);
+			return self.getDoubleArray(name, t.cast<double>(), copy, box, stride, how);
+		}, py::arg("name"), py::arg("copy") = true, py::arg("t") = py::none()
+		, py::arg("window") = py::none(), py::arg("stride") = 1, py::arg("reduce") = py::none())
+		.def("getFronts", &PLibForeFire::getFronts)
+		.def("getNewlyBurned", &PLibForeFire::getNewlyBurned)
+		.def("enableDiagnostics", &PLibForeFire::enableDiagnostics, py::arg("capacity") = 1024, py::call_guard<py::gil_scoped_release>())
+		.def("getDiagnostics", &PLibForeFire::getDiagnostics)
+		.def("enableStats", &PLibForeFire::enableStats, py::arg("enable") = true, py::call_guard<py::gil_scoped_release>())
+		.def("stats", &PLibForeFire::stats, py::arg("reset") = false)
+		.def("close", &PLibForeFire::close)
+		.def("__enter__", [](py::object self) {
+			return self;
+		})
+		.def("__exit__", [](PLibForeFire& self, py::args) {
+			self.close();
 		})
-		.def("getDoubleArray", [](PLibForeFire& self, char* name) {
-			return self.getDoubleArray(name);
+		.def("snapshot", &PLibForeFire::snapshot)
+		.def("restore", &PLibForeFire::restore, py::arg("snapshot"))
+		.def(py::pickle(
+			[](PLibForeFire& self) {
+				/* version of the state, then its snapshot */
+				py::dict snap = self.snapshot();
+				snap["arrivalTimes"] = packArrivalTimes(snap["arrivalTimes"].cast<py::array_t<double, py::array::c_style | py::array::forcecast>>());
+				return py::make_tuple(1, snap);
+			},
+			[](py::tuple state) {
+				if ( state.size() != 2 or state[0].cast<int>() != 1 ){
+					throw std::runtime_error("unsupported ForeFire state");
+				}
+				py::dict snap = state[1].cast<py::dict>();
+				snap["arrivalTimes"] = unpackArrivalTimes(snap["arrivalTimes"].cast<py::tuple>());
+				std::unique_ptr<PLibForeFire> ff(new PLibForeFire());
+				ff->restore(snap);
+				return ff;
+			}))
+		.def("clone", [](PLibForeFire& self) {
+			py::dict snap = self.snapshot();
+			PLibForeFire* other = new PLibForeFire();
+			py::object copy = py::cast(other, py::return_value_policy::take_ownership);
+			other->restore(snap);
+			return copy;
 		})
+		.def("startFires", &PLibForeFire::startFires, py::arg("points"), py::arg("times") = py::none())
+		.def("addFront", &PLibForeFire::addFront, py::arg("nodes"), py::arg("t") = 0.)
+		.def("sample", &PLibForeFire::sample, py::arg("layer"), py::arg("points"), py::arg("t") = py::none())
+		.def("setParameters", [](PLibForeFire& self, py::dict parameters) {
+			map<string, string> values;
+			for ( auto item : parameters ){
+				values[item.first.cast<string>()] = parameterString(item.second);
+			}
+			py::gil_scoped_release release;
+			self.setParameters(values);
+		}, py::arg("parameters"))
+		.def("getParameters", [](PLibForeFire& self, py::object keys) {
+			vector<string> names;
+			if ( !keys.is_none() ) names = keys.cast<vector<string>>();
+			map<string, string> values;
+			{
+				py::gil_scoped_release release;
+				values = self.getParameters(names);
+			}
+			py::dict parameters;
+			if ( keys.is_none() ){
+				map<string, string>::iterator it;
+				for ( it = values.begin(); it != values.end(); ++it ){
+					if ( it->second != undefinedParameter ) parameters[py::str(it->first)] = parameterValue(it->second);
+				}
+			}
+			for ( size_t k = 0; k < names.size(); k++ ){
+				const string& value = values[names[k]];
+				if ( value == undefinedParameter ) throw py::key_error(names[k]);
+				parameters[py::str(names[k])] = parameterValue(value);
+			}
+			return parameters;
+		}, py::arg("keys") = py::none())
+		.def("setFuelsTable", &loadFuelsTable, py::arg("table"))
 		.def("__setitem__", [](PLibForeFire &self, const std::string &key, py::object value) {
-            if (py::isinstance<py::int_>(value)) {
-                // Integer value
-                self.setInt(const_cast<char*>(key.c_str()), value.cast<int>());
-            } else if (py::isinstance<py::float_>(value)) {
-                // Double value
-                self.setDouble(const_cast<char*>(key.c_str()), value.cast<double>());
-            } else if (py::isinstance<py::str>(value)) {
-                // String value
-                std::string val = value.cast<std::string>();
-                self.setString(const_cast<char*>(key.c_str()), const_cast<char*>(val.c_str()));
-            } else {
-                throw std::runtime_error("Unsupported value type");
-            }
-        })
-        .def("__getitem__", [&](PLibForeFire &self, const std::string &key) -> py::object {
-            // This example assumes that you can somehow determine the type of the parameter
-            // beforehand, which might require additional logic in your C++ code that's not
-            // shown here.
-
-            // Placeholder for type checking. You need to implement actual type determination logic.
-            // For demonstration, this code assumes everything is treated as a string for retrieval.
-
-            // Attempt to get a string, and if it fails, fall back to double, then int.
-            try {
-                return py::cast(self.getString(const_cast<char*>(key.c_str())));
-            } catch (...) {
-                try {
-                    return py::cast(self.getDouble(const_cast<char*>(key.c_str())));
-                } catch (...) {
-                    return py::cast(self.getInt(const_cast<char*>(key.c_str())));
-                }
-            }
-        });
+			std::string val = parameterString(value);
+			py::gil_scoped_release release;
+			self.setString(const_cast<char*>(key.c_str()), const_cast<char*>(val.c_str()));
+		})
+		.def("__getitem__", [](PLibForeFire &self, const std::string &key) -> py::object {
+			std::string val;
+			{
+				py::gil_scoped_release release;
+				val = self.getString(const_cast<char*>(key.c_str()));
+			}
+			if ( val == undefinedParameter ) throw py::key_error(key);
+			return parameterValue(val);
+		});
 }
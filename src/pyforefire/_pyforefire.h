@@ -5,6 +5,9 @@
 
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
+#include <pybind11/stl.h>
+#include <mutex>
+#include <chrono>
 
 namespace py = pybind11;
 
@@ -23,13 +26,98 @@ typedef struct _SignedIntBuf
 #include <CLibForeFire.h>
 
 using namespace std;
+using namespace libforefire;
+
+#include "_engine_statics.h"
 
 class PLibForeFire {
 
+	/* A call that built the domain of an instance, replayed by restore() */
+	struct SetupRecord {
+		string call;
+		vector<string> names;
+		vector<double> box;
+		py::object values;
+	};
+	/* records are appended without the GIL : the new ones hold no Python
+	 * object and growing the vector moves the existing ones */
+	static_assert(std::is_nothrow_move_constructible<SetupRecord>::value, "SetupRecord has to be moved without refcounting");
+
+	/* The ForeFire engine keeps its session in Command statics and in the
+	 * SimulationParameters singleton : every instance owns a private copy
+	 * of that state, and of the engine statics above, and installs it in
+	 * the engine before each call.
+	 * Public methods hold the engine lock, the bindings drop the GIL
+	 * before taking it so that other Python threads keep running. */
+	Command* executor;
+	Command::Session* session;
+	SimulationParameters* params;
+
+	Command::Session savedSession;
+	map<string, string> savedParameters;
+	vector<PropagationModel*> savedPropagationModels;
+	vector<FluxModel*> savedFluxModels;
+	EngineStatics savedStatics;
+	double startTime;
+	double refTime;
+	size_t level;
+	bool building;
+	vector<SetupRecord> setup;
+	/* records dropped by a clear command, run without the GIL, until a
+	 * call holding it destroys them */
+	vector<SetupRecord> clearedSetup;
+
+	/* Wall time and number of calls of a part of the simulation,
+	 * only measured once stats are enabled */
+	struct PhaseStats {
+		size_t calls;
+		double time;
+	};
+	bool profiling;
+	map<string, PhaseStats> callStats;
+	PhaseStats eventStats[4][4];
+	size_t numEvents;
+
+	/* Points of the burning map already accounted for, and the cells of
+	 * the domain whose points all were */
+	struct BurnTracker {
+		FireDomain* domain;
+		vector<unsigned char> points;
+		vector<unsigned char> cells;
+		size_t burned;
+	};
+	BurnTracker feed;
+
+	/* diagnostics of the latest steps, one row per step in a ring */
+	BurnTracker burnedArea;
+	size_t diagnosticsCapacity;
+	size_t numDiagnostics;
+	vector<double> diagnostics;
+
+	void activate();
+	void deactivate();
+	void prepareCommand(const string&);
+	void trackCommand(const string&, bool);
+	FFArray<double>* getLayerMatrix(const string&, double);
+	string executeCommand(const string&);
+	void goToTime(double);
+	void releaseDomain();
+	bool advanceProfiled(double);
+	void countCall(const string&, chrono::steady_clock::time_point);
+	void scanBurned(BurnTracker&, vector<long>*, vector<double>*);
+	void recordDiagnostics();
+	void recordSetup(const string&, const vector<string>&);
 
 public:
 PLibForeFire();
+~PLibForeFire();
+void close();
+void dropClearedSetup();
 std::string execute(char *);
+py::list executeBatch(const vector<string>& commands);
+void goTo(double t);
+void step(double dt);
+size_t run(double until, double every, py::object callback, char* layer, py::object out);
 void createDomain( int id
 		,  int year,  int month
 		,  int day,  double t
@@ -40,8 +128,9 @@ void createDomain( int id
 		,  double dt);
 
 
-void addScalarLayer(char *type,char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, py::array_t<double> values);
-void addIndexLayer(char *type,char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, py::array_t<int> values);
+void addScalarLayer(char *type,char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, double* values);
+void addIndexLayer(char *type,char *name, double x0 , double y0, double t0, double width , double height, double timespan, int nnx, int nny, int nnz, int nnl, int* values);
+size_t updateLayer(char* name, py::array values);
 void addLayer(char*, char* ,char*);
 void setInt(char* name, int val);
 int getInt(char* name );
@@ -49,8 +138,28 @@ void setDouble(char* name, double val);
 double getDouble(char* name);
 py::array_t<double> getDoubleArray(char* name);
 py::array_t<double> getDoubleArray(char* name, double t);
+py::array_t<double> getDoubleArray(char* name, bool copy
+		, const vector<double>& window, size_t stride, const string& reduce);
+py::array_t<double> getDoubleArray(char* name, double t, bool copy
+		, const vector<double>& window, size_t stride, const string& reduce);
+py::dict getFronts();
+py::dict getNewlyBurned();
+void enableDiagnostics(size_t capacity);
+py::dict getDiagnostics();
+size_t startFires(py::array_t<double, py::array::c_style | py::array::forcecast> points, py::object times);
+py::array_t<double> sample(char* name, py::array_t<double, py::array::c_style | py::array::forcecast> points, py::object t);
+long addFront(py::array_t<double, py::array::c_style | py::array::forcecast> nodes, double t);
+void recordLayer(const string& call, char *type, char *name, double x0, double y0, double t0, double width, double height, double timespan, py::object values);
+py::dict snapshot();
+void enableStats(bool enable);
+py::dict stats(bool reset);
+void restore(py::dict snap);
 void setString(char* name, char* val);
 std::string getString(char* name);
+void setParameters(const map<string, string>& values);
+void setFuelsTable(const vector<string>& names, const vector<vector<double> >& columns);
+void recordFuelsTable(py::object table);
+map<string, string> getParameters(const vector<string>& keys);
 
 };
 
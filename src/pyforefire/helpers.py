@@ -1,15 +1,14 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.path as mpath
-import matplotlib.patches as mpatches
-import matplotlib.cm as cm
 import math
+import functools
+import re
 
 import struct
+import threading
 import zlib
 
-
-from matplotlib.colors import ListedColormap
+# matplotlib is imported by the functions using it, so that importing
+# pyforefire in processes which never plot stays cheap.
 
 def get_fuels_table(propagation_model):
     if propagation_model == 'RothermelAndrews2018':
@@ -19,7 +18,32 @@ def get_fuels_table(propagation_model):
     else:
         raise NotImplementedError
 
+@functools.lru_cache(maxsize=None)
+def get_fuels_array(propagation_model):
+    """
+    Return the fuel table of a propagation model as a structured array, to be
+    given to ff.setFuelsTable(). The table is parsed once and shared between
+    calls, so it is read-only : copy it before changing values.
+    """
+    fuels = fuelTableToArray(get_fuels_table(propagation_model)())
+    fuels.flags.writeable = False
+    return fuels
+
+def fuelTableToArray(table):
+    """
+    Convert a ';' separated fuel table, header line first, to a NumPy
+    structured array with one float64 field per column.
+    """
+    lines = table.strip().split("\n")
+    names = [name.strip() for name in lines[0].split(";")]
+    values = np.array([line.split(";") for line in lines[1:]], dtype=np.float64)
+    fuels = np.empty(len(values), dtype=[(name, np.float64) for name in names])
+    for k, name in enumerate(names):
+        fuels[name] = values[:, k]
+    return fuels
 
+
+@functools.lru_cache(maxsize=None)
 def RothermelAndrews2018FuelTable():
     """
     Table of 'SH' fuel characteristics in Andrews, 2018, page 33.
@@ -357,88 +381,199 @@ def getLocationFromLine(line):
         return None
     return (float(llr[0]),float(llr[1]))
 
+_frontPattern = re.compile(r"FireFront\[[^\]]*?\bid=(-?\d+)")
+_locationPattern = re.compile(r"loc=\(([^)]*)\)")
+
+def printToFronts(linePrinted):
+    """
+    Parse the fronts of a print[] output to arrays, as ForeFire.getFronts()
+    returns them : node locations 'loc', the 'offsets' of the nodes of each
+    front, and the 'id' and nesting 'level' of each front.
+    """
+    fronts = list(_frontPattern.finditer(linePrinted))
+    ends = [front.start() for front in fronts[1:]] + [len(linePrinted)]
+    offsets = np.zeros(len(fronts) + 1, dtype=np.int64)
+    locations = []
+    for k, front in enumerate(fronts):
+        nodes = _locationPattern.findall(linePrinted, front.end(), ends[k])
+        offsets[k + 1] = offsets[k] + len(nodes)
+        locations.extend(nodes)
+    # All the coordinates are converted at once
+    loc = np.fromstring(",".join(locations), sep=",") if locations else np.empty(0)
+    if len(loc) != 3 * offsets[-1]:
+        raise ValueError("invalid node location in print[] output")
+    # The level of a front is the indentation of its line
+    indents = [linePrinted[linePrinted.rfind("\n", 0, front.start()) + 1:front.start()] for front in fronts]
+    return {"loc": loc.reshape(-1, 3), "offsets": offsets,
+            "id": np.array([int(front.group(1)) for front in fronts], dtype=np.int64),
+            "level": np.array([len(indent.expandtabs(4)) // 4 for indent in indents], dtype=np.int64)}
+
 def printToPathe(linePrinted):
     """
     Compute the current results of simulation to pathes.
     """
-    fronts = linePrinted.split("FireFront")
+    return frontsToPathes(printToFronts(linePrinted))
+
+def frontsToPathes(fronts):
+    """
+    Compute the fronts returned by ForeFire.getFronts() to pathes.
+    """
+    import matplotlib.path as mpath
+
+    Path = mpath.Path
+    offsets = fronts["offsets"]
     pathes = []
-    for front in fronts[1:]:
-        nodes = front.split("FireNode")[1:]
-        if len(nodes) > 0:
-            Path = mpath.Path
-            codes = []
-            verts = []
-            firstNode = getLocationFromLine(nodes[0])
-            codes.append(Path.MOVETO)
-            verts.append(firstNode)
-
-            for node in nodes[:]:
-                newNode = getLocationFromLine(node)
-                codes.append(Path.LINETO)
-                verts.append(newNode)
-            codes.append(Path.LINETO)
-            verts.append(firstNode)
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        if end > start:
+            verts = np.empty((end - start + 2, 2))
+            verts[0] = fronts["loc"][start, :2]
+            verts[1:-1] = fronts["loc"][start:end, :2]
+            verts[-1] = verts[0]
+            codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+            codes[0] = Path.MOVETO
             pathes.append(mpath.Path(verts, codes))
 
     return pathes
 
 
 
-def write_png_header(width, height):
+def write_png_header(width, height, color_type=4):
     # PNG file signature
     png_signature = b'\x89PNG\r\n\x1a\n'
     
     # IHDR chunk: width, height, bit depth, color type, compression, filter, interlace
-    # Color type 4: grayscale with alpha, Bit depth 8
-    ihdr_data = struct.pack(">IIBBBBB", width, height, 8, 4, 0, 0, 0)
+    # Color type 4: grayscale with alpha, 2: RGB, 6: RGBA, 3: palette, Bit depth 8
+    ihdr_data = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
     return png_signature + create_chunk(b'IHDR', ihdr_data)
 
 def create_chunk(chunk_type, data):
     # Chunk structure: length, type, data, CRC
     chunk_length = struct.pack(">I", len(data))
-    chunk_type = chunk_type
-    chunk_crc = struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
-    return chunk_length + chunk_type + data + chunk_crc
-
-def write_png_data(data, width, height):
-    # Modify to handle transparency for grayscale value 255
-    raw_data = b''
-    for y in range(height):
-        row_data = b'\x00'  # Filter type 0 (None)
-        for x in range(width):
-            gray = data[y * width + x]
-            alpha = 0 if gray == 255 else 255  # Transparent if gray is 255
-            row_data += struct.pack("BB", gray, alpha)  # Grayscale value followed by alpha value
-        raw_data += row_data
-    compressed_data = zlib.compress(raw_data)  # Compress the data as required by the PNG specification
-    return create_chunk(b'IDAT', compressed_data)
-
-def write_png_file(filename, data, width, height):
-    with open(filename, 'wb') as f:
-        # Write header
-        f.write(write_png_header(width, height))
-        
-        # Write image data
-        f.write(write_png_data(data, width, height))
-        
-        # Write IEND chunk
-        f.write(create_chunk(b'IEND', b''))
+    chunk_crc = struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff)
+    return chunk_length + chunk_type + bytes(data) + chunk_crc
+
+def png_rows(data, width=None, height=None, palette=None):
+    """
+    Return the rows of an image as they are compressed in a PNG file,
+    filter byte first, and the header of the file, up to its image data.
+    data is a (height, width) or flat array of gray levels (255 being
+    transparent), of palette indices when a palette is given, or a
+    (height, width, 3) RGB or (height, width, 4) RGBA array.
+    palette is a (n, 3) or (n, 4) array of colors, as bytes or as floats
+    in [0, 1] like the colors of a matplotlib colormap.
+    Values are bytes : data of another type is accepted when it holds
+    integers in [0, 255] only, and raises ValueError otherwise.
+    """
+    data = np.asarray(data)
+    if height is None:
+        height, width = data.shape[:2]
+    if data.dtype != np.uint8 and data.dtype != np.bool_:
+        if data.dtype.kind not in "iu":
+            raise ValueError("data must hold integers in [0, 255], not %s values" % data.dtype)
+        if data.size and (data.min() < 0 or data.max() > 255):
+            raise ValueError("data values in [%d, %d] do not fit bytes" % (data.min(), data.max()))
+    channels = data.size // (width * height)
+    pixels = data.reshape(height, width, channels).astype(np.uint8, copy=False)
+    palette_chunks = b''
+    if palette is not None:
+        if channels != 1:
+            raise ValueError("palette images are made of one index per pixel")
+        palette = np.asarray(palette)
+        if palette.dtype.kind == 'f':
+            palette = np.round(palette * 255)
+        palette = palette.astype(np.uint8)
+        palette_chunks = create_chunk(b'PLTE', palette[:, :3].tobytes())
+        if palette.shape[1] == 4:
+            palette_chunks += create_chunk(b'tRNS', palette[:, 3].tobytes())
+        color_type = 3
+    elif channels == 1:
+        # Grayscale with alpha, transparent where gray is 255
+        pixels = np.concatenate((pixels, np.where(pixels == 255, 0, 255).astype(np.uint8)), axis=2)
+        color_type = 4
+    elif channels in (2, 3, 4):
+        color_type = {2: 4, 3: 2, 4: 6}[channels]
+    else:
+        raise ValueError("data must hold 1, 2, 3 or 4 values per pixel")
+
+    rows = np.zeros((height, 1 + pixels.shape[1] * pixels.shape[2]), dtype=np.uint8)  # Filter type 0 (None)
+    rows[:, 1:] = pixels.reshape(height, -1)
+    return rows, write_png_header(width, height, color_type) + palette_chunks
+
+def png_data_chunks(rows, level=6, chunk_size=1 << 20):
+    """
+    Compress rows returned by png_rows() block by block, yielding IDAT
+    chunks of about chunk_size bytes of rows each.
+    """
+    compressor = zlib.compressobj(level)
+    step = max(1, chunk_size // rows.shape[1])
+    for start in range(0, len(rows), step):
+        compressed_data = compressor.compress(rows[start:start + step])
+        if compressed_data:
+            yield create_chunk(b'IDAT', compressed_data)
+    yield create_chunk(b'IDAT', compressor.flush())
+
+def write_png_data(data, width, height, level=6, palette=None):
+    rows, header = png_rows(data, width, height, palette)
+    return b''.join(png_data_chunks(rows, level))
+
+def write_png_file(filename, data, width=None, height=None, level=6, palette=None, background=False):
+    """
+    Write data as a PNG file, see png_rows() for the images it takes.
+    level is the zlib compression level, from 0 (none) to 9 (smallest file).
+    With background=True, the file is compressed and written by a thread,
+    which is returned : the rows are built first, so data can change as
+    soon as the call returns.
+    """
+    rows, header = png_rows(data, width, height, palette)
+
+    def write():
+        with open(filename, 'wb') as f:
+            # Write header
+            f.write(header)
+
+            # Write image data
+            for chunk in png_data_chunks(rows, level):
+                f.write(chunk)
+
+            # Write IEND chunk
+            f.write(create_chunk(b'IEND', b''))
+
+    if background:
+        thread = threading.Thread(target=write)
+        thread.start()
+        return thread
+    write()
 
 
 
 def map_fuel_to_colors(fuelmap, fuel_list):
     """
     Convert a fuel_map for use with colors.
-    The returned fuel_map values are replaced by indices of fuels from fuel_list.
+    Return a new map where fuels are replaced by their index in fuel_list
+    plus one, and fuels missing from fuel_list by 0.
     """
-    for i in range(len(fuelmap)):
-        for j in range(len(fuelmap[0])):
-            try:
-                fuelmap[i][j] = fuel_list.index(fuelmap[i][j]) + 1
-            except ValueError:
-                fuelmap[i][j] = 0
-    return fuelmap
+    fuelmap = np.asarray(fuelmap)
+    # The first index of each fuel, as list.index() gives it
+    fuels, first = np.unique(np.asarray(fuel_list).ravel(), return_index=True)
+    dtype = np.result_type(fuelmap.dtype, np.min_scalar_type(len(fuels)))
+    if fuelmap.size == 0 or len(fuels) == 0:
+        return np.zeros(fuelmap.shape, dtype=dtype)
+
+    if fuelmap.dtype.kind in "iu":
+        # Integer maps spanning a small range of codes go through a lookup table
+        low, high = int(fuelmap.min()), int(fuelmap.max())
+        if high - low < 1 << 20 and high <= np.iinfo(np.intp).max:
+            inside = (fuels >= low) & (fuels <= high)
+            if fuels.dtype.kind == "f":
+                # codes with a fraction match no cell of an integer map
+                inside &= fuels == np.floor(fuels)
+            table = np.zeros(high - low + 1, dtype=dtype)
+            table[fuels[inside].astype(np.int64) - low] = first[inside] + 1
+            # offsets computed in intp, the dtype of the map may not hold them
+            return table[np.subtract(fuelmap, low, dtype=np.intp)]
+
+    indices = np.minimum(np.searchsorted(fuels, fuelmap), len(fuels) - 1)
+    return np.where(fuels[indices] == fuelmap, first[indices] + 1, 0).astype(dtype)
 
 def fill_random(s, k, value_yes, value_no=0):
     """Generate a randomly filled array."""
@@ -446,42 +581,84 @@ def fill_random(s, k, value_yes, value_no=0):
     return np.where(a > k, value_yes, value_no)
 
 
-def computeSpeed(atime):
+def computeSpeed(atime, spacing=1., dtype=np.float64, tile_rows=None, workers=None):
     """
     Computes the speed as the inverse of the gradient of arrival times.
     'inf' in the arrival times indicates that the point was never reached.
 
     Parameters:
         atime (np.array): 2D array of arrival times.
+        spacing (float or (dy, dx)): size of the cells, speeds are in cells
+                  per time unit when it is left to 1.
+        dtype: float type of the computation and of the speeds, np.float32
+               halves the memory needed.
+        tile_rows (int): number of rows computed at once, which bounds the
+                  memory used besides atime and the speeds.
+        workers (int): number of threads computing tiles, tiles are computed
+                  one after the other by default.
 
     Returns:
         np.array: 2D array of speeds, with the same shape as atime.
                   Returns 'inf' where the arrival time is 'inf', indicating no arrival.
     """
-    # Check where the times are infinite
-    inf_mask = np.isinf(atime)
-
-    # Replace 'inf' with the maximum finite value in atime
-    max_finite = np.nanmax(np.where(inf_mask, np.nan, atime))
-    atime_temp = np.where(inf_mask, max_finite, atime)
-
-    # Compute the gradient in the x and y directions on the modified array
-    grad_y, grad_x = np.gradient(atime_temp)
-    
-    # Compute the magnitude of the gradient
-    grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-
-    # Speed is the inverse of the gradient magnitude
-    # Avoid division by zero by adding a small number in the denominator
-    speed = np.where(grad_mag == 0, np.inf, 1 / (grad_mag + 1e-10))
-
-    # Re-assign 'inf' to the speed array where the original arrival time was 'inf'
-    speed[inf_mask] = np.inf
-
+    height, width = atime.shape
+    dy, dx = np.broadcast_to(np.asarray(spacing, dtype=np.float64), 2)
+    if tile_rows is None:
+        tile_rows = max(1, (1 << 22) // max(width, 1))
+    tiles = [(start, min(start + tile_rows, height)) for start in range(0, height, tile_rows)]
+
+    def run(compute):
+        if workers is None:
+            return [compute(tile) for tile in tiles]
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(compute, tiles))
+
+    def tile_max(tile):
+        rows = atime[tile[0]:tile[1]]
+        finite = rows[np.isfinite(rows)]
+        return finite.max() if finite.size else -np.inf
+
+    # 'inf' is replaced by the maximum finite value in atime
+    max_finite = max(run(tile_max))
+    if max_finite == -np.inf:
+        max_finite = 0.
+    speed = np.empty((height, width), dtype=dtype)
+
+    def compute(tile):
+        start, end = tile
+        # One halo row on each side gives the tile the gradient of the whole map
+        first = max(start - 1, 0)
+        rows = atime[first:min(end + 1, height)].astype(dtype)
+        inf_mask = np.isinf(rows[start - first:end - first])
+        rows[np.isinf(rows)] = max_finite
+
+        # Compute the magnitude of the gradient, in place
+        grad_y, grad_x = np.gradient(rows, dy, dx)
+        grad_mag = grad_x[start - first:end - first]
+        grad_mag *= grad_mag
+        grad_y = grad_y[start - first:end - first]
+        grad_y *= grad_y
+        grad_mag += grad_y
+        np.sqrt(grad_mag, out=grad_mag)
+
+        # Speed is the inverse of the gradient magnitude
+        # Avoid division by zero by adding a small number in the denominator
+        tile_speed = speed[start:end]
+        np.divide(1, grad_mag + 1e-10, out=tile_speed)
+        tile_speed[grad_mag == 0] = np.inf
+
+        # Re-assign 'inf' to the speed array where the original arrival time was 'inf'
+        tile_speed[inf_mask] = np.inf
+
+    run(compute)
     return speed
 
 def ignite(ff, count, mode):
-    import random
+    """
+    Start count fires at t=0 in the domain of ff, at random locations
+    (mode "random") or on an even grid (mode "even"), in one ff.startFires() call.
+    """
     # Extract the bounding box and size from ff
     SWx = float(ff["SWx"])  # Starting x coordinate
     SWy = float(ff["SWy"])  # Starting y coordinate
@@ -490,12 +667,8 @@ def ignite(ff, count, mode):
     
     # For "random" mode
     if mode == "random":
-        for i in range(count):
-            # Generate random coordinates within the bounding box
-            rand_x = SWx + random.uniform(0, Lx)
-            rand_y = SWy + random.uniform(0, Ly)
-            ff.execute(f"startFire[loc=({rand_x},{rand_y},0);t=0]")
-            print(f"Fire {i+1} started at random location: ({rand_x}, {rand_y})")
+        # Generate random coordinates within the bounding box
+        points = np.random.uniform(0, 1, (count, 2)) * (Lx, Ly) + (SWx, SWy)
     
     # For "even" mode
     elif mode == "even":
@@ -507,126 +680,143 @@ def ignite(ff, count, mode):
         step_x = Lx / (num_cols - 1) if num_cols > 1 else Lx
         step_y = Ly / (num_rows - 1) if num_rows > 1 else Ly
         
-        fire_count = 0
-        
-        # Iterate over the rows and columns to place the fires
-        for row in range(num_rows):
-            for col in range(num_cols):
-                if fire_count >= count:  # Stop once the desired number of fires are placed
-                    break
-                
-                # Evenly spaced coordinates in the grid
-                even_x = SWx + col * step_x
-                even_y = SWy + row * step_y
-                
-                ff.execute(f"startFire[loc=({even_x},{even_y},0);t=0]")
-                print(f"Fire {fire_count+1} started at grid location: ({even_x}, {even_y})")
-                
-                fire_count += 1
-    
+        # Evenly spaced coordinates in the grid, row by row, stopping once count fires are placed
+        rows, cols = np.divmod(np.arange(count), num_cols)
+        points = np.column_stack((SWx + cols * step_x, SWy + rows * step_y))
     
     else:
         raise ValueError("Invalid mode. Use 'random' or 'even'.")
 
-def plot_simulation(pathes, fuel_map, elevation_map, myExtents, scalMap = None):
+    ff.startFires(points, 0.)
+    print(f"{count} fires started at {mode} locations")
+    return points
+
+FUEL_TYPES = { # ESA EU and COrine
+    10: {'color': (0, 100, 0), 'description': 'Tree cover'},
+    20: {'color': (255, 187, 34), 'description': 'Shrubland'},
+    30: {'color': (255, 255, 76), 'description': 'Grassland'},
+    40: {'color': (240, 150, 255), 'description': 'Cropland'},
+    50: {'color': (250, 0, 0), 'description': 'Built-up'},
+    60: {'color': (180, 180, 180), 'description': 'Bare / sparse vegetation'},
+    70: {'color': (240, 240, 240), 'description': 'Snow and Ice'},
+    80: {'color': (0, 100, 200), 'description': 'Permanent water bodies'},
+    90: {'color': (0, 150, 160), 'description': 'Herbaceous wetland'},
+    95: {'color': (0, 207, 117), 'description': 'Mangroves'},
+    100: {'color': (250, 230, 160), 'description': 'Moss and lichen'},
+    0: {'color': (255, 255, 255), 'description': 'Clouds'},
+    62: {'color': (210, 0, 0),'description': 'Artificial surfaces and constructions'},
+    73: {'color': (253, 211, 39), 'description': 'Cultivated areas'},
+    75: {'color': (176, 91, 16), 'description': 'Vineyards'},
+    82: {'color': (35, 152, 0), 'description': 'Broadleaf tree cover'},
+    83: {'color': (8, 98, 0), 'description': 'Coniferous tree cover'},
+    102: {'color': (249, 150, 39), 'description': 'Herbaceous vegetation'},
+    103: {'color': (141, 139, 0), 'description': 'Moors and Heathland'},
+    104: {'color': (95, 53, 6), 'description': 'Sclerophyllous vegetation'},
+    105: {'color': (149, 107, 196), 'description': 'Marshes'},
+    106: {'color': (77, 37, 106), 'description': 'Peatbogs'},
+    121: {'color': (154, 154, 154), 'description': 'Natural material surfaces'},
+    123: {'color': (106, 255, 255),'description': 'Permanent snow covered surfaces'},
+    162: {'color': (20, 69, 249), 'description': 'Water bodies'},
+    255: {'color': (255, 255, 255), 'description': 'No data'},
+    111: {'color': (230, 0, 77), 'description': 'Urban fabric, Continuous urban fabric'},
+    112: {'color': (255, 0, 0), 'description': 'Urban fabric, Discontinuous urban fabric'},
+    121: {'color': (204, 77, 242), 'description': 'Industrial, commercial and transport units, Industrial or commercial units'},
+    122: {'color': (204, 0, 0), 'description': 'Industrial, commercial and transport units, Road and rail networks and associated land'},
+    123: {'color': (230, 204, 204), 'description': 'Industrial, commercial and transport units, Port areas'},
+    124: {'color': (230, 204, 230), 'description': 'Industrial, commercial and transport units, Airports'},
+    131: {'color': (166, 0, 204), 'description': 'Mine, dump and construction sites, Mineral extraction sites'},
+    132: {'color': (166, 77, 0), 'description': 'Mine, dump and construction sites, Dump sites'},
+    133: {'color': (255, 77, 255), 'description': 'Mine, dump and construction sites, Construction sites'},
+    141: {'color': (255, 166, 255), 'description': 'Artificial, non-agricultural vegetated areas, Green urban areas'},
+    142: {'color': (255, 230, 255), 'description': 'Artificial, non-agricultural vegetated areas, Sport and leisure facilities'},
+    211: {'color': (255, 255, 168), 'description': 'Agricultural areas, Arable land, Non-irrigated arable land'},
+    212: {'color': (255, 255, 0), 'description': 'Agricultural areas, Arable land, Permanently irrigated land'},
+    213: {'color': (230, 230, 0), 'description': 'Agricultural areas, Arable land, Rice fields'},
+    221: {'color': (230, 128, 0), 'description': 'Agricultural areas, Permanent crops, Vineyards'},
+    222: {'color': (242, 166, 77), 'description': 'Agricultural areas, Permanent crops, Fruit trees and berry plantations'},
+    223: {'color': (230, 166, 0), 'description': 'Agricultural areas, Permanent crops, Olive groves'},
+    231: {'color': (230, 230, 77), 'description': 'Agricultural areas, Pastures'},
+    241: {'color': (255, 230, 166), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Annual crops associated with permanent crops'},
+    242: {'color': (255, 230, 77), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Complex cultivation patterns'},
+    243: {'color': (230, 204, 77), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Land principally occupied by agriculture, with significant areas of natural vegetation'},
+    244: {'color': (242, 204, 166), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Agro-forestry areas'},
+    311: {'color': (128, 255, 0), 'description': 'Forest and semi natural areas, Forests, Broad-leaved forest'},
+    312: {'color': (0, 166, 0), 'description': 'Forest and semi natural areas, Forests, Coniferous forest'},
+    313: {'color': (77, 255, 0), 'description': 'Forest and semi natural areas, Forests, Mixed forest'},
+    321: {'color': (204, 242, 77), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Natural grasslands'},
+    322: {'color': (166, 255, 128), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Moors and heathland'},
+    323: {'color': (166, 230, 77), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Sclerophyllous vegetation'},
+    324: {'color': (166, 242, 0), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Transitional woodland-shrub'},
+    331: {'color': (230, 230, 230), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Beaches, dunes, sands'},
+    332: {'color': (204, 204, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Bare rocks'},
+    333: {'color': (204, 255, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Sparsely vegetated areas'},
+    334: {'color': (0, 0, 0), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Burnt areas'},
+    335: {'color': (166, 230, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Glaciers and perpetual snow'},
+    411: {'color': (166, 166, 255), 'description': 'Wetlands, Inland wetlands, Inland marshes'},
+    412: {'color': (77, 77, 255), 'description': 'Wetlands, Inland wetlands, Peat bogs'},
+    421: {'color': (204, 204, 255), 'description': 'Wetlands, Maritime wetlands, Salt marshes'},
+    422: {'color': (230, 230, 255), 'description': 'Wetlands, Maritime wetlands, Salines'},
+    423: {'color': (166, 166, 230), 'description': 'Wetlands, Maritime wetlands, Intertidal flats'},
+    511: {'color': (0, 204, 242), 'description': 'Water bodies, Inland waters, Water courses'},
+    512: {'color': (128, 242, 230), 'description': 'Water bodies, Inland waters, Water bodies'},
+    521: {'color': (0, 255, 166), 'description': 'Water bodies, Marine waters, Coastal lagoons'},
+    522: {'color': (166, 255, 230), 'description': 'Water bodies, Marine waters, Estuaries'},
+    523: {'color': (230, 242, 255), 'description': 'Water bodies, Marine waters, Sea and ocean'}
+    }
+
+@functools.lru_cache(maxsize=None)
+def fuel_colormap():
+    """
+    Return the colormap of FUEL_TYPES, colors sorted by fuel code.
+    """
+    from matplotlib.colors import ListedColormap
+
+    # Normalize the colors to the [0, 1] range expected by matplotlib
+    return ListedColormap([tuple(x / 255.0 for x in FUEL_TYPES[key]['color']) for key in sorted(FUEL_TYPES)])
+
+def decimate_path(path, step):
+    """
+    Keep one vertex out of step in a closed front path, and its closing vertex.
+    """
+    import matplotlib.path as mpath
+
+    if step <= 1 or len(path.vertices) <= 3:
+        return path
+    verts = np.concatenate((path.vertices[:-1:step], path.vertices[-1:]))
+    codes = np.full(len(verts), mpath.Path.LINETO, dtype=mpath.Path.code_type)
+    codes[0] = mpath.Path.MOVETO
+    return mpath.Path(verts, codes)
+
+def plot_simulation(pathes, fuel_map, elevation_map, myExtents, scalMap = None, decimate=1, filename=None):
     """
     Used for plot 4 axis graph, with Heatflux, Fuels, Altitude plotted under simulation, 
     and Statistics for the last axis.
+    Fronts are drawn as a single collection, keeping one vertex out of decimate.
+    With a filename, the figure is rendered to that file by Agg, without any
+    display, instead of being shown.
     """
+    import matplotlib
+    from matplotlib.collections import PathCollection
+
     #import seaborn as sns
     # Create a figure with 2 axis (2 subplots)
-    fig, ax = plt.subplots(figsize=(10,7), dpi=120)
+    if filename is None:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(10,7), dpi=120)
+    else:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=(10,7), dpi=120)
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
 
     # Get fuel_map matrix
     if fuel_map is not None:
         fuels = fuel_map
         
-        fuel_types = { # ESA EU and COrine
-            10: {'color': (0, 100, 0), 'description': 'Tree cover'},
-            20: {'color': (255, 187, 34), 'description': 'Shrubland'},
-            30: {'color': (255, 255, 76), 'description': 'Grassland'},
-            40: {'color': (240, 150, 255), 'description': 'Cropland'},
-            50: {'color': (250, 0, 0), 'description': 'Built-up'},
-            60: {'color': (180, 180, 180), 'description': 'Bare / sparse vegetation'},
-            70: {'color': (240, 240, 240), 'description': 'Snow and Ice'},
-            80: {'color': (0, 100, 200), 'description': 'Permanent water bodies'},
-            90: {'color': (0, 150, 160), 'description': 'Herbaceous wetland'},
-            95: {'color': (0, 207, 117), 'description': 'Mangroves'},
-            100: {'color': (250, 230, 160), 'description': 'Moss and lichen'},
-            0: {'color': (255, 255, 255), 'description': 'Clouds'},
-            62: {'color': (210, 0, 0),'description': 'Artificial surfaces and constructions'},
-            73: {'color': (253, 211, 39), 'description': 'Cultivated areas'},
-            75: {'color': (176, 91, 16), 'description': 'Vineyards'},
-            82: {'color': (35, 152, 0), 'description': 'Broadleaf tree cover'},
-            83: {'color': (8, 98, 0), 'description': 'Coniferous tree cover'},
-            102: {'color': (249, 150, 39), 'description': 'Herbaceous vegetation'},
-            103: {'color': (141, 139, 0), 'description': 'Moors and Heathland'},
-            104: {'color': (95, 53, 6), 'description': 'Sclerophyllous vegetation'},
-            105: {'color': (149, 107, 196), 'description': 'Marshes'},
-            106: {'color': (77, 37, 106), 'description': 'Peatbogs'},
-            121: {'color': (154, 154, 154), 'description': 'Natural material surfaces'},
-            123: {'color': (106, 255, 255),'description': 'Permanent snow covered surfaces'},
-            162: {'color': (20, 69, 249), 'description': 'Water bodies'},
-            255: {'color': (255, 255, 255), 'description': 'No data'},
-            111: {'color': (230, 0, 77), 'description': 'Urban fabric, Continuous urban fabric'},
-            112: {'color': (255, 0, 0), 'description': 'Urban fabric, Discontinuous urban fabric'},
-            121: {'color': (204, 77, 242), 'description': 'Industrial, commercial and transport units, Industrial or commercial units'},
-            122: {'color': (204, 0, 0), 'description': 'Industrial, commercial and transport units, Road and rail networks and associated land'},
-            123: {'color': (230, 204, 204), 'description': 'Industrial, commercial and transport units, Port areas'},
-            124: {'color': (230, 204, 230), 'description': 'Industrial, commercial and transport units, Airports'},
-            131: {'color': (166, 0, 204), 'description': 'Mine, dump and construction sites, Mineral extraction sites'},
-            132: {'color': (166, 77, 0), 'description': 'Mine, dump and construction sites, Dump sites'},
-            133: {'color': (255, 77, 255), 'description': 'Mine, dump and construction sites, Construction sites'},
-            141: {'color': (255, 166, 255), 'description': 'Artificial, non-agricultural vegetated areas, Green urban areas'},
-            142: {'color': (255, 230, 255), 'description': 'Artificial, non-agricultural vegetated areas, Sport and leisure facilities'},
-            211: {'color': (255, 255, 168), 'description': 'Agricultural areas, Arable land, Non-irrigated arable land'},
-            212: {'color': (255, 255, 0), 'description': 'Agricultural areas, Arable land, Permanently irrigated land'},
-            213: {'color': (230, 230, 0), 'description': 'Agricultural areas, Arable land, Rice fields'},
-            221: {'color': (230, 128, 0), 'description': 'Agricultural areas, Permanent crops, Vineyards'},
-            222: {'color': (242, 166, 77), 'description': 'Agricultural areas, Permanent crops, Fruit trees and berry plantations'},
-            223: {'color': (230, 166, 0), 'description': 'Agricultural areas, Permanent crops, Olive groves'},
-            231: {'color': (230, 230, 77), 'description': 'Agricultural areas, Pastures'},
-            241: {'color': (255, 230, 166), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Annual crops associated with permanent crops'},
-            242: {'color': (255, 230, 77), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Complex cultivation patterns'},
-            243: {'color': (230, 204, 77), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Land principally occupied by agriculture, with significant areas of natural vegetation'},
-            244: {'color': (242, 204, 166), 'description': 'Agricultural areas, Heterogeneous agricultural areas, Agro-forestry areas'},
-            311: {'color': (128, 255, 0), 'description': 'Forest and semi natural areas, Forests, Broad-leaved forest'},
-            312: {'color': (0, 166, 0), 'description': 'Forest and semi natural areas, Forests, Coniferous forest'},
-            313: {'color': (77, 255, 0), 'description': 'Forest and semi natural areas, Forests, Mixed forest'},
-            321: {'color': (204, 242, 77), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Natural grasslands'},
-            322: {'color': (166, 255, 128), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Moors and heathland'},
-            323: {'color': (166, 230, 77), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Sclerophyllous vegetation'},
-            324: {'color': (166, 242, 0), 'description': 'Forest and semi natural areas, Scrub and/or herbaceous vegetation associations, Transitional woodland-shrub'},
-            331: {'color': (230, 230, 230), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Beaches, dunes, sands'},
-            332: {'color': (204, 204, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Bare rocks'},
-            333: {'color': (204, 255, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Sparsely vegetated areas'},
-            334: {'color': (0, 0, 0), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Burnt areas'},
-            335: {'color': (166, 230, 204), 'description': 'Forest and semi natural areas, Open spaces with little or no vegetation, Glaciers and perpetual snow'},
-            411: {'color': (166, 166, 255), 'description': 'Wetlands, Inland wetlands, Inland marshes'},
-            412: {'color': (77, 77, 255), 'description': 'Wetlands, Inland wetlands, Peat bogs'},
-            421: {'color': (204, 204, 255), 'description': 'Wetlands, Maritime wetlands, Salt marshes'},
-            422: {'color': (230, 230, 255), 'description': 'Wetlands, Maritime wetlands, Salines'},
-            423: {'color': (166, 166, 230), 'description': 'Wetlands, Maritime wetlands, Intertidal flats'},
-            511: {'color': (0, 204, 242), 'description': 'Water bodies, Inland waters, Water courses'},
-            512: {'color': (128, 242, 230), 'description': 'Water bodies, Inland waters, Water bodies'},
-            521: {'color': (0, 255, 166), 'description': 'Water bodies, Marine waters, Coastal lagoons'},
-            522: {'color': (166, 255, 230), 'description': 'Water bodies, Marine waters, Estuaries'},
-            523: {'color': (230, 242, 255), 'description': 'Water bodies, Marine waters, Sea and ocean'}
-            }
-        # Normalize the colors to the [0, 1] range expected by matplotlib
-        for key in fuel_types:
-            rgb = fuel_types[key]['color']
-            fuel_types[key]['color'] = tuple([x/255.0 for x in rgb])
-        
-        # Generate the list of colors
-        colors = [fuel_types[key]['color'] for key in sorted(fuel_types.keys())]
-        
-        # Create the colormap
-        lcmap = ListedColormap(colors) 
-        
-        CS = ax.imshow(fuels, cmap=lcmap, interpolation='nearest', origin='lower', extent=myExtents)
+        CS = ax.imshow(fuels, cmap=fuel_colormap(), interpolation='nearest', origin='lower', extent=myExtents)
        # norm = mcolors.BoundaryNorm(bounds, cmap.N)
-        plt.colorbar(CS)
+        fig.colorbar(CS, ax=ax)
 
     
     if elevation_map is not None:
@@ -637,37 +827,46 @@ def plot_simulation(pathes, fuel_map, elevation_map, myExtents, scalMap = None):
     
     if scalMap is not None:
         CS = ax.imshow(scalMap, origin='lower', extent=myExtents)
-        plt.colorbar(CS)
+        fig.colorbar(CS, ax=ax)
 
-    path_colors = [cm.get_cmap('autumn')(i / len(pathes)) for i in range(len(pathes))]
-    # Plot current firefronts to the first 3 subplots
-    for p, path in enumerate(pathes):
-        patch = mpatches.PathPatch(path, edgecolor=path_colors[p], facecolor='none', alpha=1, lw=2)
-        ax.add_patch(patch)
-        ax.grid()
-        ax.axis('equal')
+    # Plot current firefronts, colored from the first to the last one
+    path_colors = matplotlib.colormaps['autumn'](np.arange(len(pathes)) / max(len(pathes), 1))
+    fronts = PathCollection([decimate_path(path, decimate) for path in pathes], edgecolors=path_colors,
+                            facecolors='none', alpha=1, linewidths=2)
+    ax.add_collection(fronts)
+    ax.autoscale_view()
 
     ax.grid()
     ax.axis('equal')
-    plt.show()
+    if filename is None:
+        plt.show()
+    else:
+        fig.savefig(filename)
 
 
 
-def print_ff_script(file_path):
+def read_ff_script(file_path):
     """
-    Executes each line of a .ff script file using the ff.execute() method,
-    after stripping leading and trailing whitespace, including tabs.
+    Return the commands of a .ff script file, one per line, keeping the
+    leading tabs that give the level of FireFront and FireNode commands.
     """
-    # Open the file with the script
     with open(file_path, 'r') as file:
-        # Iterate over each line in the file
-        for line in file:
-            # Strip leading and trailing whitespace, including tabs, from the line
-            clean_line = line.strip()
-            # Check if the cleaned line is not empty
-            if clean_line:
-                # Execute the cleaned line with ff.execute, ensuring no leading/trailing whitespace
-                command = f'ff.execute("{clean_line}")'
-                print(command)  # This is for demonstration; replace with actual ff.execute(clean_line) in use
-                # If you have the ff object with an execute method available, you would call it here:
-                # ff.execute(clean_line)
+        commands = [line.rstrip() for line in file]
+    return [command for command in commands if command.strip()]
+
+def execute_ff_script(ff, file_path):
+    """
+    Executes a .ff script file in a single ff.executeBatch() call.
+    Return a list of (output, error, console) for each command, error
+    being None unless ForeFire reported a failure of the command.
+    """
+    return ff.executeBatch(read_ff_script(file_path))
+
+def print_ff_script(file_path):
+    """
+    Print the ff.execute() calls of a .ff script file, after stripping
+    leading and trailing whitespace, including tabs.
+    Use execute_ff_script() to run it.
+    """
+    for command in read_ff_script(file_path):
+        print(f'ff.execute("{command.strip()}")')
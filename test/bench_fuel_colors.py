@@ -0,0 +1,47 @@
+"""Time of map_fuel_to_colors against the loop over the cells it replaced,
+run as a script : python bench_fuel_colors.py [cells ...]"""
+
+import sys
+import time
+
+import numpy as np
+
+from pyforefire.helpers import map_fuel_to_colors
+
+
+def map_fuel_to_colors_loop(fuelmap, fuel_list):
+    # the original helper, which changes fuelmap in place
+    for i in range(len(fuelmap)):
+        for j in range(len(fuelmap[0])):
+            try:
+                fuelmap[i][j] = fuel_list.index(fuelmap[i][j]) + 1
+            except ValueError:
+                fuelmap[i][j] = 0
+    return fuelmap
+
+
+def bench(cells, loop_cells=500):
+    """Times both on a cells x cells map of Corine like codes, the loop on
+    loop_cells x loop_cells at most and scaled to the full map."""
+    rng = np.random.default_rng(0)
+    fuel_list = sorted(rng.choice(np.arange(100, 600), 45, replace=False).tolist())
+    fuelmap = rng.choice(fuel_list + [0, 999], size=(cells, cells)).astype(np.int32)
+
+    start = time.perf_counter()
+    colors = map_fuel_to_colors(fuelmap, fuel_list)
+    vectorized = time.perf_counter() - start
+
+    part = min(cells, loop_cells)
+    sample = fuelmap[:part, :part].copy()
+    start = time.perf_counter()
+    expected = map_fuel_to_colors_loop(sample, fuel_list)
+    loop = (time.perf_counter() - start) * (cells / part) ** 2
+    np.testing.assert_array_equal(colors[:part, :part], expected)
+    print("%6d x %-6d  loop %9.3f s%s  vectorized %8.4f s  x%.0f"
+          % (cells, cells, loop, "*" if part < cells else " ", vectorized, loop / vectorized))
+
+
+if __name__ == "__main__":
+    for cells in [int(arg) for arg in sys.argv[1:]] or [250, 1000, 4000]:
+        bench(cells)
+    print("* extrapolated from a 500 x 500 corner")
@@ -0,0 +1,41 @@
+"""Throughput of pickling, unpickling and cloning simulations with large
+layers, run as a script : python bench_pickle.py [cells ...]"""
+
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from common import make_simulation
+
+
+def best_time(call, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench(cells):
+    """Times the serialization of a simulation with fuel, altitude and two
+    wind layers of cells x cells points."""
+    size = 20 * cells
+    ff = make_simulation(size=size, resolution=20, fire=(size / 2, size / 2))
+    for name in ("windU", "windV"):
+        ff.addScalarLayer("data", name, 0, 0, 0, size, size, 0, np.random.default_rng(0).random((cells, cells)))
+    ff.goTo(200)
+
+    dump_time, payload = best_time(lambda: pickle.dumps(ff, protocol=pickle.HIGHEST_PROTOCOL))
+    load_time, _ = best_time(lambda: pickle.loads(payload))
+    clone_time, _ = best_time(ff.clone)
+    mb = len(payload) / 2**20
+    print("%6d x %-6d %8.1f MB  dumps %7.3f s %8.0f MB/s  loads %7.3f s %8.0f MB/s  clone %7.3f s"
+          % (cells, cells, mb, dump_time, mb / dump_time, load_time, mb / load_time, clone_time))
+
+
+if __name__ == "__main__":
+    for cells in [int(arg) for arg in sys.argv[1:]] or [250, 500, 1000, 2000]:
+        bench(cells)
@@ -0,0 +1,92 @@
+"""Time of parsing the fronts of a print[] output, with printToFronts and
+printToPathe, against the parser they replaced, across front sizes.
+Run as a script : python bench_print_fronts.py [nodes ...]"""
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from pyforefire.helpers import printToFronts, printToPathe
+
+
+def getLocationFromLine(line):
+    # the original parser, splitting the output once per node
+    llv = line.split("loc=(")
+    if len(llv) < 2:
+        return None
+    llr = llv[1].split(",")
+    if len(llr) < 3:
+        return None
+    return (float(llr[0]), float(llr[1]))
+
+
+def printToPatheSplit(linePrinted):
+    import matplotlib.path as mpath
+
+    fronts = linePrinted.split("FireFront")
+    pathes = []
+    for front in fronts[1:]:
+        nodes = front.split("FireNode")[1:]
+        if len(nodes) > 0:
+            Path = mpath.Path
+            codes = []
+            verts = []
+            firstNode = getLocationFromLine(nodes[0])
+            codes.append(Path.MOVETO)
+            verts.append(firstNode)
+            for node in nodes[:]:
+                newNode = getLocationFromLine(node)
+                codes.append(Path.LINETO)
+                verts.append(newNode)
+            codes.append(Path.LINETO)
+            verts.append(firstNode)
+            pathes.append(mpath.Path(verts, codes))
+    return pathes
+
+
+def printed_fronts(nodes, fronts=4):
+    """print[] output of a domain holding fronts circles of nodes nodes in
+    all, formatted as the engine writes them."""
+    lines = ["FireDomain[sw=(0,0,0);ne=(100000,100000,0);t=3600]"]
+    node_id = 0
+    for f in range(fronts):
+        lines.append("    FireFront[id=%d;domain=0;t=0]" % (f + 2))
+        count = nodes // fronts
+        for k in range(count):
+            angle = 2 * math.pi * k / count
+            x = 20000 * (f + 1) + 5000 * math.cos(angle)
+            y = 50000 + 5000 * math.sin(angle)
+            node_id += 1
+            lines.append("        FireNode[domain=0;id=%d;fdepth=5;kappa=0.000191;loc=(%.6g,%.6g,0);"
+                         "vel=(%.6g,%.6g,0);t=3580.12;state=moving;frontId=%d]"
+                         % (node_id, x, y, math.cos(angle), math.sin(angle), f + 2))
+    return "\n".join(lines)
+
+
+def best_time(call, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench(nodes):
+    text = printed_fronts(nodes)
+    split_time, expected = best_time(lambda: printToPatheSplit(text))
+    fronts_time, fronts = best_time(lambda: printToFronts(text))
+    pathes_time, pathes = best_time(lambda: printToPathe(text))
+    assert len(fronts["loc"]) == nodes // 4 * 4
+    for path, old in zip(pathes, expected):
+        np.testing.assert_array_equal(path.vertices, old.vertices)
+    print("%8d nodes %7.2f MB  split %8.4f s  printToFronts %8.4f s x%-5.0f  printToPathe %8.4f s x%.0f"
+          % (nodes, len(text) / 2**20, split_time, fronts_time, split_time / fronts_time,
+             pathes_time, split_time / pathes_time))
+
+
+if __name__ == "__main__":
+    for nodes in [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 100000]:
+        bench(nodes)
@@ -0,0 +1,51 @@
+"""Small simulations shared by the tests : an isotropic spread over a flat
+and uniform landscape, cheap enough to run many times."""
+
+import numpy as np
+
+import pyforefire as forefire
+
+
+def make_simulation(speed=1.0, size=2000, resolution=20, fire=(1000, 1000), **parameters):
+    """Returns a ForeFire instance with a domain of size x size meters, fuel
+    and altitude layers of the given resolution and, unless fire is None,
+    a fire started at fire. Other keywords are parameters set before the
+    domain is created."""
+    ff = forefire.ForeFire()
+    ff["propagationModel"] = "Iso"
+    ff["Iso.speed"] = float(speed)
+    ff["spatialIncrement"] = 3.0
+    ff["minimalPropagativeFrontDepth"] = float(resolution)
+    ff["perimeterResolution"] = 40.0
+    ff["initialFrontDepth"] = 5.0
+    ff["relax"] = 0.2
+    ff["minSpeed"] = 0.0
+    ff["bmapLayer"] = 1
+    ff["windU"] = 0.0
+    ff["windV"] = 0.0
+    ff["defaultFuelType"] = 1
+    ff.setParameters(parameters)
+    ff.execute("FireDomain[sw=(0.,0.,0.);ne=(%d,%d,0.);t=0.]" % (size, size))
+    ff.addLayer("BRatio", "BRatio", "BRatio")
+    ff.addLayer("data", "windU", "windU")
+    ff.addLayer("data", "windV", "windV")
+    ff.addLayer("propagation", "Iso", "propagationModel")
+    n = size // resolution
+    ff.addIndexLayer("table", "fuel", 0, 0, 0, size, size, 0, np.full((n, n), 111, dtype=np.int32))
+    ff.addScalarLayer("table", "altitude", 0, 0, 0, size, size, 0, np.zeros((n, n)))
+    if fire is not None:
+        ff.startFires(np.array([fire], dtype=float))
+    return ff
+
+
+def burnt(ff):
+    """Mask of the points of the burning map reached by the fire."""
+    return np.isfinite(ff.snapshot()["arrivalTimes"])
+
+
+def run_tests(namespace):
+    """Runs the test functions of a module executed as a script."""
+    for name, test in sorted(namespace.items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print("%s passed" % name)
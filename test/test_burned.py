@@ -0,0 +1,76 @@
+"""Points burnt step by step, and the diagnostics recorded with the steps."""
+
+import numpy as np
+
+from common import make_simulation, run_tests
+
+
+def test_feed_covers_the_arrival_times_once():
+    ff = make_simulation()
+    batches = []
+    for t in (100, 200, 200, 300):
+        ff.goTo(t)
+        burned = ff.getNewlyBurned()
+        assert burned["index"].shape == (len(burned["time"]), 2)
+        batches.append(burned)
+    # nothing burns without a step
+    assert len(batches[2]["time"]) == 0
+    assert batches[1]["time"].min() > 100 and batches[3]["time"].min() > 200
+    assert all((burned["time"] <= t).all() for burned, t in zip(batches, (100, 200, 200, 300)))
+
+    arrival_times = ff.snapshot()["arrivalTimes"]
+    index = np.concatenate([burned["index"] for burned in batches])
+    times = np.concatenate([burned["time"] for burned in batches])
+    expected = np.argwhere(np.isfinite(arrival_times))
+    assert len(index) == len(expected)
+    np.testing.assert_array_equal(np.unique(index, axis=0), expected)
+    np.testing.assert_array_equal(times, arrival_times[index[:, 0], index[:, 1]])
+
+
+def test_feed_starts_over_with_a_new_domain():
+    ff = make_simulation()
+    ff.goTo(100)
+    assert len(ff.getNewlyBurned()["time"]) > 0
+    ff.execute("clear")
+    ff.execute("FireDomain[sw=(0.,0.,0.);ne=(2000,2000,0.);t=0.]")
+    ff.addLayer("BRatio", "BRatio", "BRatio")
+    ff.addLayer("propagation", "Iso", "propagationModel")
+    ff.addIndexLayer("table", "fuel", 0, 0, 0, 2000, 2000, 0, np.full((100, 100), 111, dtype=np.int32))
+    ff.addScalarLayer("table", "altitude", 0, 0, 0, 2000, 2000, 0, np.zeros((100, 100)))
+    ff.startFires(np.array([(500., 500.)]))
+    ff.goTo(100)
+    burned = ff.getNewlyBurned()
+    arrival_times = ff.snapshot()["arrivalTimes"]
+    np.testing.assert_array_equal(np.unique(burned["index"], axis=0), np.argwhere(np.isfinite(arrival_times)))
+
+
+def test_diagnostics_follow_the_steps():
+    # points of the burning map are 20 m apart
+    ff = make_simulation(speed=1.0)
+    ff.enableDiagnostics(3)
+    areas = []
+    for advance in (lambda: ff.goTo(100), lambda: ff.step(100), lambda: ff.execute("goTo[t=300]"),
+                    lambda: ff.run(until=400, every=50)):
+        advance()
+        areas.append(np.isfinite(ff.snapshot()["arrivalTimes"]).sum() * 20. * 20.)
+    diagnostics = ff.getDiagnostics()
+    # the ring keeps the latest steps, oldest first
+    np.testing.assert_array_equal(diagnostics["time"], [300, 350, 400])
+    assert diagnostics["area"][0] == areas[2] and diagnostics["area"][-1] == areas[3]
+    assert (np.diff(diagnostics["area"]) > 0).all()
+
+    fronts = ff.getFronts()
+    assert diagnostics["fronts"][-1] == len(fronts["id"]) == 1
+    assert diagnostics["nodes"][-1] == len(fronts["loc"])
+    loc = fronts["loc"][:, :2]
+    np.testing.assert_allclose(diagnostics["perimeter"][-1], np.hypot(*(np.roll(loc, -1, axis=0) - loc).T).sum())
+    assert (diagnostics["minROS"] <= diagnostics["meanROS"]).all() and (diagnostics["meanROS"] <= diagnostics["maxROS"]).all()
+    np.testing.assert_allclose(diagnostics["maxROS"], 1.)
+
+    ff.enableDiagnostics(0)
+    ff.goTo(450)
+    assert all(len(values) == 0 for values in ff.getDiagnostics().values())
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,28 @@
+"""Commands run in batches, with the console of each one captured."""
+
+import os
+import tempfile
+
+from common import make_simulation, run_tests
+
+
+def test_batch_reports_failures_only():
+    ff = make_simulation()
+    ff.goTo(10)
+    with tempfile.TemporaryDirectory() as folder:
+        saved = os.path.join(folder, "saved.nc")
+        results = ff.executeBatch(["save[filename=%s]" % saved, "", "bogus[]", "goTo[t=20]"])
+    assert len(results) == 4
+    # a command printing a message is not an error
+    output, error, console = results[0]
+    assert error is None and "saved" in console
+    assert results[1] == ("", None, "")
+    output, error, console = results[2]
+    assert "unknown command" in error and error in console
+    assert results[3][1] is None
+    # the batch went on after the failure
+    assert ff.execute("print[]").splitlines()[0].endswith("t=20]")
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,58 @@
+"""Fronts built from and exported to NumPy arrays."""
+
+import numpy as np
+
+from pyforefire.helpers import printToFronts, printToPathe
+
+from common import burnt, make_simulation, run_tests
+
+# square of 200 m around the center of the domain, clockwise
+SQUARE = np.array([[900., 900.], [900., 1100.], [1100., 1100.], [1100., 900.]])
+
+
+def spread_from(nodes):
+    ff = make_simulation(fire=None)
+    ff.addFront(nodes)
+    ff.goTo(200)
+    return ff
+
+
+def test_front_windings_spread_alike():
+    clockwise = spread_from(SQUARE)
+    counter_clockwise = spread_from(SQUARE[::-1])
+    fronts = clockwise.getFronts()
+    assert len(fronts["loc"]) > 0
+    # the fire spread outward from the square, by 200 m at 1 m/s
+    assert fronts["loc"][:, 0].min() < 750 and fronts["loc"][:, 0].max() > 1250
+    np.testing.assert_array_equal(counter_clockwise.getFronts()["loc"], fronts["loc"])
+    np.testing.assert_array_equal(burnt(counter_clockwise), burnt(clockwise))
+
+
+def test_flat_front_is_rejected():
+    ff = make_simulation(fire=None)
+    try:
+        ff.addFront(np.array([[0., 0.], [100., 100.], [200., 200.]]))
+    except ValueError as error:
+        assert "area" in str(error)
+    else:
+        raise AssertionError("a flat front was accepted")
+
+
+def test_printed_fronts_parse_to_the_exported_arrays():
+    ff = make_simulation(fire=None)
+    ff.startFires(np.array([[500., 500.], [1500., 1500.]]))
+    ff.goTo(100)
+    printed = ff.execute("print[]")
+    fronts = ff.getFronts()
+    parsed = printToFronts(printed)
+    for key in ("offsets", "id", "level"):
+        np.testing.assert_array_equal(parsed[key], fronts[key])
+    # print[] writes 6 significant digits
+    np.testing.assert_allclose(parsed["loc"], fronts["loc"], rtol=1e-5)
+    pathes = printToPathe(printed)
+    assert len(pathes) == len(fronts["id"]) == 2
+    np.testing.assert_array_equal(pathes[0].vertices[[0, -1]], parsed["loc"][[0, 0], :2])
+
+
+if __name__ == "__main__":
+    run_tests(globals())
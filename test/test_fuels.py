@@ -0,0 +1,57 @@
+"""Fuel tables loaded as arrays into the models of a domain."""
+
+import pickle
+
+import numpy as np
+
+import pyforefire as forefire
+
+from common import run_tests
+from test_instances import fronts, windy_simulation
+
+
+def fuels(coeff):
+    return np.array([(111, coeff)], dtype=[("Index", np.int64), ("vv_coeff", float)])
+
+
+def test_array_spreads_like_the_text_table():
+    with windy_simulation(3.0, "Index;vv_coeff\n111;2.0") as text:
+        text.goTo(100)
+        expected = fronts(text)
+    with windy_simulation(3.0) as ff:
+        ff.setFuelsTable(fuels(2.0))
+        ff.goTo(100)
+        np.testing.assert_array_equal(fronts(ff), expected)
+
+
+def test_clone_keeps_the_table():
+    with windy_simulation(3.0) as ff, windy_simulation(3.0) as slow:
+        ff.setFuelsTable(fuels(2.0))
+        ff.goTo(100)
+        clone = pickle.loads(pickle.dumps(ff))
+        ff.goTo(150)
+        clone.goTo(150)
+        slow.goTo(150)
+        assert abs(fronts(clone)[:, 0].max() - fronts(ff)[:, 0].max()) < 1
+        assert fronts(clone)[:, 0].max() > fronts(slow)[:, 0].max() + 100
+
+
+def test_tables_missing_properties_are_rejected():
+    with windy_simulation(3.0) as ff:
+        table = np.array([(111, 2.0)], dtype=[("Index", np.int64), ("speed", float)])
+        try:
+            ff.setFuelsTable(table)
+        except ValueError as error:
+            assert "vv_coeff" in str(error)
+        else:
+            raise AssertionError("a table without vv_coeff was loaded")
+    try:
+        forefire.ForeFire().setFuelsTable(fuels(2.0))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("a table was loaded without a domain")
+
+
+if __name__ == "__main__":
+    run_tests(globals())
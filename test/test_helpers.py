@@ -0,0 +1,159 @@
+"""Helpers working on the arrays of a simulation, without the engine."""
+
+import os
+import tempfile
+import zlib
+
+import numpy as np
+
+from pyforefire.helpers import (computeSpeed, decimate_path, frontsToPathes, map_fuel_to_colors, plot_simulation,
+                                png_rows, write_png_file)
+
+from common import run_tests
+
+
+def colors_of(fuelmap, fuel_list):
+    # what the original loop over the cells returned
+    return [[fuel_list.index(code) + 1 if code in fuel_list else 0 for code in row] for row in fuelmap.tolist()]
+
+
+def test_fuel_colors_of_signed_maps():
+    fuel_list = [-100, -3, 0, 7, 100, 127, 500]
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        # 100 - (-100) overflows int8
+        fuelmap = np.array([[-100, -3, -1, 0], [7, 100, 45, -3]], dtype=dtype)
+        kept = fuelmap.copy()
+        colors = map_fuel_to_colors(fuelmap, fuel_list)
+        np.testing.assert_array_equal(colors, colors_of(fuelmap, fuel_list))
+        np.testing.assert_array_equal(fuelmap, kept)
+
+
+def test_fuel_colors_of_unsigned_and_float_maps():
+    fuel_list = [111, 75, 2**40, 3.5]
+    for dtype in (np.uint8, np.uint16, np.uint64, np.float64):
+        fuelmap = np.array([[111, 0, 75], [255, 111, 3]], dtype=dtype)
+        np.testing.assert_array_equal(map_fuel_to_colors(fuelmap, fuel_list), colors_of(fuelmap, fuel_list))
+    huge = np.array([[2**64 - 1, 2**40, 111]], dtype=np.uint64)
+    np.testing.assert_array_equal(map_fuel_to_colors(huge, fuel_list), [[0, 3, 1]])
+
+
+def png_chunks(png, kind):
+    chunks, start = [], 0
+    while start < len(png):
+        length = int.from_bytes(png[start:start + 4], "big")
+        if png[start + 4:start + 8] == kind:
+            chunks.append(png[start + 8:start + 8 + length])
+        start += 12 + length
+    return chunks
+
+
+def test_png_pixels_of_integer_arrays():
+    gray = np.array([[0, 17, 255], [3, 128, 254]])
+    for dtype in (np.uint8, np.int16, np.int64, np.uint32):
+        rows, header = png_rows(gray.astype(dtype))
+        np.testing.assert_array_equal(rows[:, 1::2], gray)
+        np.testing.assert_array_equal(rows[:, 2::2], np.where(gray == 255, 0, 255))
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "gray.png")
+        write_png_file(filename, gray.astype(np.int32))
+        with open(filename, "rb") as f:
+            png = f.read()
+    assert png.startswith(header)
+    assert zlib.decompress(b"".join(png_chunks(png[len(header):], b"IDAT"))) == rows.tobytes()
+
+
+def test_png_values_not_bytes_are_rejected():
+    for data in (np.array([[0.5, 1.0]]), np.array([[0, 256]]), np.array([[-1, 3]], dtype=np.int8)):
+        try:
+            png_rows(data)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("%r was written as bytes" % data)
+
+
+def arrival_times(height=90, width=130):
+    # a cone spreading half a cell per second from row 40, column 50, with
+    # a flat patch and points never reached
+    y, x = np.mgrid[0:height, 0:width]
+    atime = 2. * np.hypot(x - 50, y - 40)
+    atime[10:20, 100:120] = 7.
+    atime[atime > 150] = np.inf
+    return atime
+
+
+def speed_of(atime, dy=1., dx=1.):
+    # the whole map at once, as computeSpeed did before it worked by tiles
+    rows = atime.copy()
+    rows[np.isinf(rows)] = rows[np.isfinite(rows)].max()
+    grad_y, grad_x = np.gradient(rows, dy, dx)
+    grad_mag = np.sqrt(grad_x**2 + grad_y**2)
+    speed = 1 / (grad_mag + 1e-10)
+    speed[grad_mag == 0] = np.inf
+    speed[np.isinf(atime)] = np.inf
+    return speed
+
+
+def test_speeds_by_tiles_match_the_whole_map():
+    atime = arrival_times()
+    expected = speed_of(atime)
+    np.testing.assert_array_equal(computeSpeed(atime), expected)
+    for tile_rows, workers in ((1, None), (7, None), (89, None), (7, 3), (1, 8)):
+        np.testing.assert_array_equal(computeSpeed(atime, tile_rows=tile_rows, workers=workers), expected)
+    assert np.isinf(computeSpeed(np.full((4, 5), np.inf))).all()
+
+
+def test_speeds_spacing_and_dtype():
+    atime = arrival_times()
+    np.testing.assert_allclose(computeSpeed(atime, spacing=20.), speed_of(atime, 20., 20.))
+    np.testing.assert_allclose(computeSpeed(atime, spacing=(10., 25.), tile_rows=6), speed_of(atime, 10., 25.))
+    single = computeSpeed(atime, spacing=20., dtype=np.float32, tile_rows=6, workers=2)
+    assert single.dtype == np.float32
+    expected = speed_of(atime, 20., 20.)
+    finite = np.isfinite(expected)
+    np.testing.assert_array_equal(np.isfinite(single), finite)
+    np.testing.assert_allclose(single[finite], expected[finite], rtol=1e-5)
+    # 10 m/s with 20 m cells, away from the apex and the patch
+    y, x = np.mgrid[0:90, 0:130]
+    ring = (np.hypot(x - 50, y - 40) > 10) & (np.hypot(x - 50, y - 40) < 70) & ((x < 95) | (y > 25))
+    np.testing.assert_allclose(expected[ring], 10., rtol=0.01)
+
+
+def circles(nodes, count=3):
+    # getFronts() arrays of count circles of nodes nodes
+    angles = 2 * np.pi * np.arange(nodes) / nodes
+    loc = np.concatenate([np.column_stack([500 * (k + 1) + 200 * np.cos(angles), 1000 + 200 * np.sin(angles),
+                                           np.zeros(nodes)]) for k in range(count)])
+    return {"loc": loc, "offsets": np.arange(count + 1) * nodes}
+
+
+def test_decimated_fronts_stay_closed():
+    path = frontsToPathes(circles(400, 1))[0]
+    assert decimate_path(path, 1) is path
+    for step in (2, 7, 400):
+        decimated = decimate_path(path, step)
+        np.testing.assert_array_equal(decimated.vertices[:-1], path.vertices[:-1:step])
+        np.testing.assert_array_equal(decimated.vertices[-1], decimated.vertices[0])
+        assert decimated.codes[0] == path.codes[0] and (decimated.codes[1:] == path.codes[-1]).all()
+
+
+def test_simulation_plots_are_written_without_display():
+    import matplotlib.pyplot as plt
+
+    figures = plt.get_fignums()
+    pathes = frontsToPathes(circles(400))
+    fuel_map = np.arange(100, dtype=np.int32).reshape(10, 10) % 3
+    with tempfile.TemporaryDirectory() as folder:
+        images = []
+        for decimate in (1, 1, 100):
+            filename = os.path.join(folder, "fronts%d.png" % len(images))
+            plot_simulation(pathes, fuel_map, None, (0, 2000, 0, 2000), decimate=decimate, filename=filename)
+            with open(filename, "rb") as f:
+                images.append(f.read())
+    assert all(image.startswith(b"\x89PNG") for image in images)
+    assert images[0] == images[1] and images[2] != images[0]
+    assert plt.get_fignums() == figures
+
+
+if __name__ == "__main__":
+    run_tests(globals())
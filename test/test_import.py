@@ -0,0 +1,40 @@
+"""Importing pyforefire stays cheap for short-lived worker processes."""
+
+import json
+import subprocess
+import sys
+
+from common import run_tests
+
+# seconds spent importing pyforefire once numpy is loaded
+IMPORT_BUDGET = 0.2
+
+PROBE = """
+import json, sys, time
+import numpy
+start = time.perf_counter()
+import pyforefire
+elapsed = time.perf_counter() - start
+print(json.dumps({"time": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_probe():
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_plotting():
+    modules = import_probe()["modules"]
+    for heavy in ("matplotlib", "PIL", "scipy"):
+        assert heavy not in modules, heavy
+
+
+def test_import_time_budget():
+    # best of a few fresh interpreters, the first one may warm the disk cache
+    elapsed = min(import_probe()["time"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, "import pyforefire took %.3f s" % elapsed
+
+
+if __name__ == "__main__":
+    run_tests(globals())
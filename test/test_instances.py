@@ -0,0 +1,120 @@
+"""Instances sharing the engine : each one runs as if it were alone."""
+
+import threading
+import time
+
+import numpy as np
+
+import pyforefire as forefire
+
+from common import make_simulation, run_tests
+
+
+def fronts(ff):
+    return ff.getFronts()["loc"]
+
+
+def test_interleaved_instances_match_solo_runs():
+    solo_a = make_simulation(1.0, fire=(700, 700))
+    solo_a.goTo(200)
+    solo_a.goTo(400)
+    expected_a = fronts(solo_a)
+    solo_a.close()
+    solo_b = make_simulation(2.0, fire=(1300, 1300))
+    solo_b.goTo(150)
+    solo_b.goTo(300)
+    expected_b = fronts(solo_b)
+    solo_b.close()
+
+    a = make_simulation(1.0, fire=(700, 700))
+    a.goTo(200)
+    # b starts its session once a already stepped
+    b = make_simulation(2.0, fire=(1300, 1300))
+    b.goTo(150)
+    a.goTo(400)
+    b.goTo(300)
+    np.testing.assert_array_equal(fronts(a), expected_a)
+    np.testing.assert_array_equal(fronts(b), expected_b)
+    assert a["Iso.speed"] == 1.0 and b["Iso.speed"] == 2.0
+
+
+def test_instances_keep_their_front_schemes():
+    # relax and minSpeed are copied by the engine when a domain is created
+    with make_simulation(1.0, fire=(700, 700)) as solo:
+        solo.goTo(300)
+        expected = fronts(solo)
+
+    a = make_simulation(1.0, fire=(700, 700))
+    a.goTo(150)
+    b = make_simulation(1.0, fire=(1300, 1300), relax=0.9, minSpeed=0.5)
+    b.goTo(150)
+    a.goTo(300)
+    np.testing.assert_array_equal(fronts(a), expected)
+    with make_simulation(1.0, fire=(1300, 1300), relax=0.9, minSpeed=0.5) as solo_b:
+        solo_b.goTo(300)
+        b.goTo(300)
+        np.testing.assert_array_equal(fronts(b), fronts(solo_b))
+
+
+def windy_simulation(wind, fuels="Index;vv_coeff\n111;1.0"):
+    # fronts only driven by the wind layer of the instance
+    ff = forefire.ForeFire()
+    ff.setParameters({"propagationModel": "WindDriven", "windReductionFactor": 1.0, "spatialIncrement": 3.0,
+                      "minimalPropagativeFrontDepth": 20.0, "perimeterResolution": 40.0,
+                      "initialFrontDepth": 5.0, "relax": 0.2, "minSpeed": 0.0, "bmapLayer": 1,
+                      "defaultFuelType": 1, "fuelsTable": fuels})
+    ff.execute("FireDomain[sw=(0.,0.,0.);ne=(2000,2000,0.);t=0.]")
+    ff.addLayer("BRatio", "BRatio", "BRatio")
+    ff.addScalarLayer("data", "windU", 0, 0, 0, 2000, 2000, 0, np.full((100, 100), float(wind)))
+    ff.addScalarLayer("data", "windV", 0, 0, 0, 2000, 2000, 0, np.zeros((100, 100)))
+    ff.addLayer("propagation", "WindDriven", "propagationModel")
+    ff.addIndexLayer("table", "fuel", 0, 0, 0, 2000, 2000, 0, np.full((100, 100), 111, dtype=np.int32))
+    ff.addScalarLayer("table", "altitude", 0, 0, 0, 2000, 2000, 0, np.zeros((100, 100)))
+    ff.startFires(np.array([(1000., 1000.)]))
+    return ff
+
+
+def test_instances_read_their_own_layers():
+    with windy_simulation(3.0) as solo:
+        solo.goTo(200)
+        expected = fronts(solo)
+
+    east = windy_simulation(3.0)
+    east.goTo(100)
+    # the wind of the latest domain created blows the other way
+    west = windy_simulation(-3.0)
+    west.goTo(100)
+    east.goTo(200)
+    np.testing.assert_array_equal(fronts(east), expected)
+    assert fronts(west)[:, 0].mean() < 1000 < fronts(east)[:, 0].mean()
+
+
+def test_instance_destroyed_while_another_thread_steps():
+    # the destructor waits for the engine with the GIL given back, the
+    # other Python threads keep running meanwhile
+    a = make_simulation(5.0, size=4000, fire=(2000, 2000))
+    b = make_simulation(2.0)
+    ticks = []
+    stop = threading.Event()
+
+    def tick():
+        while not stop.is_set():
+            ticks.append(time.perf_counter())
+            time.sleep(0.001)
+
+    worker = threading.Thread(target=a.goTo, args=(350,))
+    ticker = threading.Thread(target=tick)
+    worker.start()
+    time.sleep(0.05)
+    ticker.start()
+    start = time.perf_counter()
+    del b
+    end = time.perf_counter()
+    worker.join()
+    stop.set()
+    ticker.join()
+    assert sum(start < t < end for t in ticks) > 10
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,151 @@
+"""Layers loaded from and read back to NumPy arrays."""
+
+import threading
+
+import numpy as np
+
+from common import make_simulation, run_tests
+
+
+def test_updates_write_into_the_layer():
+    ff = make_simulation()
+    heat = np.arange(200.).reshape(10, 20)
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, heat)
+    # Fortran ordered doubles are copied straight into the layer
+    assert ff.updateLayer("heat", np.asfortranarray(2 * heat)) == 0
+    np.testing.assert_array_equal(ff.getDoubleArray("heat")[0, 0], 2 * heat)
+    assert ff.updateLayer("heat", (3 * heat).astype(np.float32)) == heat.nbytes
+    np.testing.assert_array_equal(ff.getDoubleArray("heat")[0, 0], 3 * heat)
+    # read by the engine from the layer itself
+    ff.updateLayer("heat", np.full((10, 20), 7.))
+    np.testing.assert_allclose(ff.sample("heat", [(1000., 1000.)]), [7.])
+    ff.updateLayer("heat", 3 * heat)
+    # clones start from the latest values
+    ff.goTo(50)
+    np.testing.assert_array_equal(ff.clone().getDoubleArray("heat")[0, 0], 3 * heat)
+
+
+def test_updates_not_fitting_the_layer_are_rejected():
+    ff = make_simulation()
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, np.zeros((10, 20)))
+    for name, values in (("heat", np.ones((20, 10))), ("heat", np.ones((2, 10, 20))),
+                         ("BMap", np.ones((100, 100))), ("nope", np.ones((10, 20)))):
+        try:
+            ff.updateLayer(name, values)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("%r updated %s" % (values.shape, name))
+    np.testing.assert_array_equal(ff.getDoubleArray("heat"), 0.)
+
+
+def blocks_of(values, stride, reduce):
+    # stride x stride blocks of the last two axes, the last ones cut short
+    ny, nx = values.shape[-2:]
+    padded = np.full(values.shape[:-2] + (-(-ny // stride) * stride, -(-nx // stride) * stride), np.nan)
+    padded[..., :ny, :nx] = values
+    blocks = padded.reshape(padded.shape[:-2] + (padded.shape[-2] // stride, stride, padded.shape[-1] // stride, stride))
+    return getattr(np, "nan" + reduce)(blocks, axis=(-3, -1))
+
+
+def test_windows_and_strides_match_numpy():
+    ff = make_simulation()
+    heat = np.random.default_rng(0).random((2, 1, 30, 50))
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 100, heat)
+    full = ff.getDoubleArray("heat")
+    np.testing.assert_array_equal(full, heat)
+    # cells of 40 x 66.7 m, the window overlaps columns 2 to 37 and rows 4 to 26
+    window = (100, 310, 1500, 1790)
+    cells = heat[..., 4:27, 2:38]
+    np.testing.assert_array_equal(ff.getDoubleArray("heat", window=window), cells)
+    np.testing.assert_array_equal(ff.getDoubleArray("heat", window=(-500, -500, 5000, 5000)), heat)
+    for stride in (1, 2, 3, 7, 60):
+        np.testing.assert_array_equal(ff.getDoubleArray("heat", stride=stride), heat[..., ::stride, ::stride])
+        np.testing.assert_array_equal(ff.getDoubleArray("heat", window=window, stride=stride), cells[..., ::stride, ::stride])
+        np.testing.assert_array_equal(ff.getDoubleArray("heat", window=window, stride=stride, copy=False),
+                                      cells[..., ::stride, ::stride])
+        for reduce in ("min", "max", "mean"):
+            np.testing.assert_allclose(ff.getDoubleArray("heat", stride=stride, reduce=reduce),
+                                       blocks_of(heat, stride, reduce), rtol=1e-12)
+            np.testing.assert_allclose(ff.getDoubleArray("heat", window=window, stride=stride, reduce=reduce),
+                                       blocks_of(cells, stride, reduce), rtol=1e-12)
+
+
+def test_bad_windows_are_rejected():
+    ff = make_simulation()
+    for options in ({"window": (1000, 0, 500, 2000)}, {"window": (0, 0, 2000)}, {"stride": 0},
+                    {"stride": 2, "reduce": "sum"}, {"stride": 2, "reduce": "mean", "copy": False}):
+        try:
+            ff.getDoubleArray("altitude", **options)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("altitude read with %r" % options)
+
+
+def test_copies_are_taken_under_the_engine_lock():
+    # updateLayer rewrites the layer from another thread : every copy has
+    # to hold the values of a single update
+    ff = make_simulation(fire=None)
+    n = 1000
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, np.zeros((n, n)))
+    stop = threading.Event()
+
+    def update():
+        value = 0
+        while not stop.is_set():
+            value += 1
+            ff.updateLayer("heat", np.full((n, n), float(value)))
+
+    writer = threading.Thread(target=update)
+    writer.start()
+    try:
+        for _ in range(50):
+            values = ff.getDoubleArray("heat")
+            assert values.min() == values.max()
+            window = ff.getDoubleArray("heat", window=(100, 100, 1500, 1500), stride=3)
+            assert window.min() == window.max()
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_views_outlive_their_domain():
+    ff = make_simulation()
+    ff.goTo(100)
+    view = ff.getDoubleArray("altitude", copy=False)
+    bmap = ff.getDoubleArray("BMap", copy=False)
+    expected = ff.getDoubleArray("BMap")
+    assert not view.flags.writeable
+
+    ff.close()
+    np.testing.assert_array_equal(view, 0.)
+    np.testing.assert_array_equal(bmap, expected)
+    # the instance builds a new domain while the views still read the old one
+    ff.execute("FireDomain[sw=(0.,0.,0.);ne=(1000.,1000.,0.);t=0.]")
+    ff.addScalarLayer("table", "altitude", 0, 0, 0, 1000, 1000, 0, np.ones((10, 10)))
+    np.testing.assert_array_equal(view, 0.)
+    np.testing.assert_array_equal(ff.getDoubleArray("altitude", copy=False), 1.)
+    del ff
+    np.testing.assert_array_equal(bmap, expected)
+
+
+def test_views_outlive_restore():
+    ff = make_simulation()
+    ff.goTo(100)
+    snap = ff.snapshot()
+    bmap = ff.getDoubleArray("BMap", copy=False)
+    expected = bmap.copy()
+    ff.goTo(200)
+    ff.restore(snap)
+    ff.execute("clear")
+    np.testing.assert_array_equal(bmap, expected)
+    # the domain is deleted with its last view
+    other = bmap[0, 0]
+    del bmap
+    np.testing.assert_array_equal(other, expected[0, 0])
+    del other
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,47 @@
+"""Memory of the domains given back once their instance closes them."""
+
+import sys
+
+from common import make_simulation, run_tests
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+def resident_memory():
+    """Resident memory of the process in MB."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        # peak memory only, in bytes on macOS and in KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def test_domains_released_while_another_instance_lives(cycles=1000, budget=64):
+    if resource is None:
+        return
+    other = make_simulation(2.0, fire=(500, 500))
+    other.goTo(50)
+
+    def cycle():
+        with make_simulation(1.0) as ff:
+            ff.goTo(50)
+        other.step(1)
+
+    # the first cycles allocate the pools reused by the following ones
+    for _ in range(20):
+        cycle()
+    start = resident_memory()
+    for _ in range(cycles):
+        cycle()
+    growth = resident_memory() - start
+    assert growth < budget, "%.0f MB more after %d cycles" % (growth, cycles)
+    assert len(other.getFronts()["loc"]) > 0
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,64 @@
+"""Parameters read back as the values they hold, one by one or in bulk."""
+
+import numpy as np
+
+import pyforefire as forefire
+
+from common import run_tests
+
+
+def test_values_are_read_back_typed():
+    ff = forefire.ForeFire()
+    ff["Lx"] = 3000
+    ff["SWx"] = 0.5
+    ff["propagationModel"] = "Rothermel"
+    ff["bmapLayer"] = True
+    ff["dt"] = 1 / 3
+    ff["atmoNX"] = np.int32(12)
+    ff["perimeterResolution"] = np.float64(0.1)
+    assert ff["Lx"] == 3000 and type(ff["Lx"]) is int
+    assert ff["Lx"] + ff["SWx"] == 3000.5
+    assert ff["propagationModel"] == "Rothermel"
+    assert ff["bmapLayer"] == 1
+    # floats at full precision
+    assert ff["dt"] == 1 / 3
+    assert ff["atmoNX"] == 12 and type(ff["atmoNX"]) is int
+    assert ff["perimeterResolution"] == 0.1 and type(ff["perimeterResolution"]) is float
+    assert ff.getDouble("SWx") == 0.5 and ff.getInt("Lx") == 3000
+    try:
+        ff["Ly"] = [1, 2]
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("a list was set as a parameter")
+
+
+def test_bulk_access():
+    ff = forefire.ForeFire()
+    values = {"Lx": 3000, "Ly": 2000.25, "SWx": -10, "propagationModel": "Iso", "Iso.speed": 1 / 7}
+    ff.setParameters(values)
+    assert ff.getParameters(list(values)) == values
+    # keys come back in the order asked for
+    assert list(ff.getParameters(["SWx", "Lx"])) == ["SWx", "Lx"]
+    everything = ff.getParameters()
+    assert all(everything[key] == value for key, value in values.items())
+    assert all(ff[key] == value for key, value in everything.items())
+    ff.setParameters({"Lx": 10})
+    assert ff["Lx"] == 10 and ff["Ly"] == 2000.25
+
+
+def test_missing_parameters_raise_key_error():
+    ff = forefire.ForeFire()
+    ff["Lx"] = 3000
+    for read in (lambda: ff["neverSetParameter"], lambda: ff.getParameters(["Lx", "neverSetParameter"])):
+        try:
+            read()
+        except KeyError as error:
+            assert error.args == ("neverSetParameter",)
+        else:
+            raise AssertionError("a parameter never set was read")
+    assert "neverSetParameter" not in ff.getParameters()
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,71 @@
+"""Time advanced with goTo, step and run."""
+
+import numpy as np
+
+from common import burnt, make_simulation, run_tests
+
+
+def simulation_time(ff):
+    return ff.snapshot()["time"]
+
+
+def test_steps_reach_the_state_of_goTo():
+    ff = make_simulation()
+    for _ in range(4):
+        ff.step(50)
+    assert simulation_time(ff) == 200
+    reference = make_simulation()
+    reference.goTo(200)
+    np.testing.assert_array_equal(burnt(ff), burnt(reference))
+
+
+def test_run_calls_back_and_copies_each_output():
+    ff = make_simulation()
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, np.zeros((10, 10)))
+    times = []
+
+    def callback(t):
+        times.append(t)
+        ff.updateLayer("heat", np.full((10, 10), t))
+
+    out = np.full((6, 10, 10), np.nan)
+    assert ff.run(until=450, every=100, callback=callback, layer="heat", out=out) == 5
+    assert times == [100, 200, 300, 400, 450]
+    # each output is copied before its callback is called
+    for row, value in zip(out, [0, 100, 200, 300, 400]):
+        np.testing.assert_array_equal(row, value)
+    assert np.isnan(out[5]).all()
+    reference = make_simulation()
+    reference.goTo(450)
+    np.testing.assert_array_equal(burnt(ff), burnt(reference))
+
+
+def test_callback_returning_false_stops_the_run():
+    ff = make_simulation()
+    times = []
+
+    def callback(t):
+        times.append(t)
+        return t < 200
+
+    assert ff.run(until=1000, every=100, callback=callback) == 2
+    assert times == [100, 200]
+    assert simulation_time(ff) == 200
+    # only False stops it
+    assert ff.run(until=400, every=100, callback=lambda t: None) == 2
+    assert simulation_time(ff) == 400
+
+
+def test_outputs_not_fitting_out_are_rejected():
+    for out in (np.empty((2, 100, 100)), np.empty((3, 50, 50)), np.empty((3, 100, 100), dtype=np.float32)):
+        ff = make_simulation()
+        try:
+            ff.run(until=300, every=100, layer="altitude", out=out)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("outputs were copied to %r" % (out.shape,))
+
+
+if __name__ == "__main__":
+    run_tests(globals())
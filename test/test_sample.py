@@ -0,0 +1,53 @@
+"""Layers evaluated at arrays of points."""
+
+import numpy as np
+
+from common import make_simulation, run_tests
+
+
+def centers(nx, ny, size=2000):
+    # cell centers of a nx x ny layer covering the domain, row by row
+    x, y = np.meshgrid((np.arange(nx) + 0.5) * size / nx, (np.arange(ny) + 0.5) * size / ny)
+    return np.column_stack([x.ravel(), y.ravel()])
+
+
+def test_points_read_the_layer_values():
+    ff = make_simulation()
+    heat = np.arange(200.).reshape(10, 20)
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, heat)
+    points = centers(20, 10)
+    values = ff.sample("heat", points).reshape(10, 20)
+    # bilinear between the centers, the last row and column lie outside
+    inside = np.isfinite(values)
+    assert inside[:-1, :-1].all()
+    np.testing.assert_allclose(values[inside], heat[inside], atol=0.05)
+    # rows with z, or a list, are the same points
+    np.testing.assert_array_equal(ff.sample("heat", np.column_stack([points, np.zeros(len(points))])).reshape(10, 20), values)
+    np.testing.assert_array_equal(ff.sample("heat", points[:5].tolist()), values.ravel()[:5])
+    np.testing.assert_array_equal(ff.sample("fuel", centers(100, 100)), 111.)
+    np.testing.assert_array_equal(ff.sample("altitude", np.empty((0, 2))), [])
+
+
+def test_points_are_read_at_the_simulation_time():
+    ff = make_simulation()
+    heat = np.stack([np.zeros((1, 10, 20)), np.full((1, 10, 20), 10.)])
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 100, heat)
+    points = centers(20, 10)
+    ff.goTo(30)
+    np.testing.assert_array_equal(ff.sample("heat", points), ff.sample("heat", points, t=30.))
+    assert not np.array_equal(ff.sample("heat", points, t=60.), ff.sample("heat", points), equal_nan=True)
+
+
+def test_bad_probes_are_rejected():
+    ff = make_simulation()
+    for layer, points in (("nope", np.zeros((3, 2))), ("altitude", np.zeros((3, 4))), ("altitude", np.zeros(3))):
+        try:
+            ff.sample(layer, points)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("%s sampled at %r" % (layer, points.shape))
+
+
+if __name__ == "__main__":
+    run_tests(globals())
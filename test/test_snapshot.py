@@ -0,0 +1,111 @@
+"""Snapshots, restore and clones of a simulation."""
+
+import pickle
+import weakref
+
+import numpy as np
+
+from common import burnt, make_simulation, run_tests
+from test_memory import resident_memory
+
+
+def layer_arrays(snap):
+    return {record[2]: record[-1] for record in snap["setup"] if record[0] in ("addScalarLayer", "addIndexLayer")}
+
+
+def test_clone_matches_the_original():
+    ff = make_simulation()
+    ff.goTo(100)
+    copy = ff.clone()
+    ff.goTo(200)
+    copy.goTo(200)
+    np.testing.assert_array_equal(burnt(copy), burnt(ff))
+
+
+def test_layers_are_recorded_as_private_copies():
+    ff = make_simulation(fire=None)
+    # C ordered, converted for the engine
+    heat = np.arange(100 * 100, dtype=np.float32).reshape(100, 100)
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, heat)
+    wind = np.zeros((100, 100), order="F")
+    ff.addScalarLayer("data", "windU", 0, 0, 0, 2000, 2000, 0, wind)
+    snap = ff.snapshot()
+    # the caller reuses its buffers once the layers are loaded
+    heat[:] = -1
+    wind[:] = 7
+    recorded = layer_arrays(snap)
+    np.testing.assert_array_equal(recorded["heat"], np.arange(100 * 100).reshape(100, 100))
+    assert not recorded["heat"].flags.writeable and not recorded["windU"].flags.writeable
+    copy = ff.clone()
+    np.testing.assert_array_equal(copy.getDoubleArray("windU")[0, 0], 0)
+    # clones share the recorded arrays of the original
+    assert layer_arrays(copy.snapshot())["heat"] is layer_arrays(ff.snapshot())["heat"]
+    ff.restore(snap)
+    np.testing.assert_array_equal(ff.getDoubleArray("windU")[0, 0], 0)
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(ff)).getDoubleArray("heat")[0, 0, 5], np.arange(500, 600))
+
+
+def test_loading_keeps_one_private_copy():
+    ff = make_simulation(fire=None)
+    n = 2048
+    heat = np.ones((n, n))  # 32 MB, C ordered
+    start = resident_memory()
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, heat)
+    growth = resident_memory() - start
+    # the engine copy and the Fortran ordered one, kept as the record
+    assert growth < 2.5 * heat.nbytes / 2**20, "%.0f MB" % growth
+
+
+def test_clear_drops_the_setup():
+    ff = make_simulation(fire=None)
+    records = len(ff.snapshot()["setup"])
+    # read-only and owning its data, recorded as it is
+    heat = np.ones((100, 100), order="F")
+    heat.setflags(write=False)
+    ff.addScalarLayer("data", "heat", 0, 0, 0, 2000, 2000, 0, heat)
+    recorded = weakref.ref(heat)
+    del heat
+    for _ in range(50):
+        ff.execute("clear")
+        ff.execute("FireDomain[sw=(0.,0.,0.);ne=(2000,2000,0.);t=0.]")
+        ff.addLayer("BRatio", "BRatio", "BRatio")
+        ff.addLayer("propagation", "Iso", "propagationModel")
+        ff.addIndexLayer("table", "fuel", 0, 0, 0, 2000, 2000, 0, np.full((100, 100), 111, dtype=np.int32))
+        ff.addScalarLayer("table", "altitude", 0, 0, 0, 2000, 2000, 0, np.zeros((100, 100)))
+    assert recorded() is None
+    assert len(ff.snapshot()["setup"]) <= records
+    ff.startFires(np.array([(1000., 1000.)]))
+    ff.goTo(50)
+    assert burnt(ff.clone()).any()
+
+
+def test_pickled_simulation_resumes():
+    ff = make_simulation()
+    ff.goTo(100)
+    payload = pickle.dumps(ff, protocol=pickle.HIGHEST_PROTOCOL)
+    copy = pickle.loads(payload)
+    np.testing.assert_array_equal(burnt(copy), burnt(ff))
+    ff.goTo(200)
+    copy.goTo(200)
+    np.testing.assert_array_equal(burnt(copy), burnt(ff))
+
+
+def test_fronts_are_kept_as_arrays():
+    ff = make_simulation()
+    ff.goTo(100)
+    fronts = ff.snapshot()["fronts"]
+    expected = ff.getFronts()
+    for key in expected:
+        np.testing.assert_array_equal(fronts[key], expected[key])
+    nodes = len(expected["loc"])
+    assert all(fronts[key].shape == (nodes,) for key in ("nodeId", "depth", "curvature", "time"))
+    assert fronts["frontTime"].shape == expected["id"].shape
+    assert b"FireNode[" not in pickle.dumps(ff, protocol=pickle.HIGHEST_PROTOCOL)
+    # fronts are numbered by a counter shared by the instances
+    cloned = ff.clone().snapshot()["fronts"]
+    for key in ("loc", "vel", "offsets", "level", "depth", "curvature", "time", "frontTime"):
+        np.testing.assert_array_equal(cloned[key], fronts[key])
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,47 @@
+"""Instrumentation of the commands, layers and steps of a simulation."""
+
+from common import make_simulation, run_tests
+
+
+def test_nothing_is_measured_while_disabled():
+    ff = make_simulation()
+    ff.goTo(50)
+    ff.getDoubleArray("altitude")
+    stats = ff.stats()
+    assert not stats["enabled"]
+    assert stats["events"] == 0 and stats["phases"] == {} and stats["calls"] == {}
+    # the fronts are counted all the same
+    fronts = ff.getFronts()
+    assert stats["nodes"] == len(fronts["loc"]) and stats["fronts"] == len(fronts["id"])
+
+
+def test_steps_commands_and_layers_are_measured():
+    ff = make_simulation()
+    ff.goTo(50)
+    ff.enableStats()
+    ff.goTo(100)
+    ff.step(50)
+    ff.execute("goTo[t=200]")
+    ff.getDoubleArray("altitude")
+    ff.getDoubleArray("altitude", window=(0, 0, 1000, 1000), stride=2)
+    stats = ff.stats(reset=True)
+    assert stats["enabled"]
+    assert stats["calls"]["goTo"]["calls"] == 3
+    assert stats["calls"]["getDoubleArray[altitude]"]["calls"] == 2
+    assert all(call["time"] >= 0 for call in stats["calls"].values())
+    # every event goes through each phase of its atom once
+    assert stats["events"] > 0
+    assert stats["phases"]["FireNode.timeAdvance"]["calls"] == stats["phases"]["FireNode.update"]["calls"]
+    assert sum(phase["calls"] for name, phase in stats["phases"].items() if name.endswith(".update")) == stats["events"]
+    fronts = ff.getFronts()
+    assert stats["nodes"] == len(fronts["loc"]) and stats["fronts"] == len(fronts["id"])
+
+    stats = ff.stats()
+    assert stats["events"] == 0 and stats["phases"] == {} and stats["calls"] == {}
+    ff.enableStats(False)
+    ff.goTo(250)
+    assert ff.stats()["events"] == 0
+
+
+if __name__ == "__main__":
+    run_tests(globals())